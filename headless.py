@@ -0,0 +1,19 @@
+import argparse
+import sys
+import traceback
+
+from src.headless.headless_collector import HeadlessCollector
+from src.headless.headless_config import CONFIG_PATH, load_config
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="摄像头采集器(无界面)")
+    parser.add_argument("-c", "--config", default=CONFIG_PATH, help="配置文件路径")
+    args = parser.parse_args()
+
+    try:
+        collector = HeadlessCollector(load_config(args.config))
+        collector.run_forever()
+    except Exception as e:
+        traceback.print_exc()
+        sys.exit(-111)
@@ -1,15 +1,52 @@
+import argparse
 import sys
 import traceback
-from PyQt6.QtWidgets import QApplication
 
-from src.errorDisplay import showError
-from src.gui.main.main_window import MainWindow
+from src.common.startup_profile import startup_profile
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="摄像头采集器")
+    parser.add_argument(
+        "--profile-startup", action="store_true", help="输出启动各阶段和各模块导入耗时"
+    )
+    parser.add_argument("--profile-output", default=None, help="启动耗时输出文件")
+    parser.add_argument("--api", action="store_true", help="开启本地自动化HTTP接口")
+    parser.add_argument("--api-host", default="127.0.0.1", help="自动化接口监听地址")
+    parser.add_argument("--api-port", type=int, default=18080, help="自动化接口端口")
+    parser.add_argument(
+        "--api-allow-host", action="append", default=[], help="自动化接口额外允许的Host名称"
+    )
+    args, qtArgs = parser.parse_known_args()
+
+    # 需在导入其他模块前开启, 才能统计到所有导入
+    if args.profile_startup:
+        startup_profile.enable()
+
+    with startup_profile.phase("import qt"):
+        from PyQt6.QtWidgets import QApplication
+
+        from src.errorDisplay import showError
+
+    app = QApplication(sys.argv[:1] + qtArgs)
     try:
-        window = MainWindow()
+        with startup_profile.phase("import main window"):
+            from src.gui.main.main_window import MainWindow
+
+        with startup_profile.phase("create main window"):
+            window = MainWindow()
+
+        # 窗口首次绘制后才创建后台模块, 创建完成后再开启接口和输出启动耗时
+        if args.api:
+            window.started_signal.connect(
+                lambda: window.start_api(
+                    args.api_host, args.api_port, args.api_allow_host
+                )
+            )
+        if args.profile_startup:
+            window.started_signal.connect(
+                lambda: startup_profile.dump(args.profile_output)
+            )
         window.show()
         sys.exit(app.exec())
     except Exception as e:
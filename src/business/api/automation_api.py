@@ -0,0 +1,418 @@
+import json
+import re
+import threading
+from concurrent.futures import CancelledError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from src.business.management.socket.socket_management import COMMAND_TIMEOUTS
+from src.business.management.socket.socket_management_command import SocketCommand
+from src.log import log
+
+API_HOST = "127.0.0.1"
+API_PORT = 18080
+MAX_BODY_BYTES = 1024 * 1024
+# 等待命令结果时在执行器超时之上多等的时间(秒)
+RESULT_GRACE = 1.0
+# 升级耗时很长, 默认只提交不等待结果
+NO_WAIT_COMMANDS = (SocketCommand.UPGRADE.value,)
+LOOPBACK_NAMES = ("127.0.0.1", "localhost", "[::1]")
+WILDCARD_HOSTS = ("", "0.0.0.0", "::")
+# 以JSON文本原样发给摄像头的命令参数
+JSON_TEXT_FIELDS = ("config", "control")
+# 请求体中控制接口行为的字段, 不属于命令参数
+REQUEST_OPTIONS = ("wait", "timeout")
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def parse_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def info_to_dict(info) -> dict:
+    return {
+        "uuid": info.uuid,
+        "ip": info.ip,
+        "port": info.port,
+        "last_seen": info.last_seen,
+    }
+
+
+# 配置和控制命令在进程内是JSON字符串, 接口中也接受JSON对象, 其他类型拒绝
+def encode_json_text(value, name) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    raise ApiError(400, f"{name} must be a string or an object")
+
+
+# 配置在进程内是JSON字符串, 接口中按JSON对象返回
+def decode_result(command, result):
+    if command == SocketCommand.GET_CONFIG.value and isinstance(result, str):
+        try:
+            return json.loads(result)
+        except ValueError:
+            return result
+    return result
+
+
+# 本地自动化接口: 每个请求一个线程, 命令提交到DriverManagement的执行器后等待Future
+# 只接受Host为本机名称(及allowed_hosts)的请求, 防止DNS重绑定后网页访问接口
+class AutomationApi:
+    def __init__(
+        self, driver_management, host=API_HOST, port=API_PORT, allowed_hosts=()
+    ) -> None:
+        self.driver_management = driver_management
+        self.host = host
+        self.port = port
+        self.allowedNames = set(LOOPBACK_NAMES) | set(allowed_hosts)
+        if host not in WILDCARD_HOSTS:
+            self.allowedNames.add(f"[{host}]" if ":" in host else host)
+        self.allowedHosts = set()
+        self.logger = log.get_logger()
+        self.server = None
+        self.thread = None
+
+    def start(self) -> None:
+        if self.server is not None:
+            return
+        self.server = ThreadingHTTPServer((self.host, self.port), AutomationRequestHandler)
+        self.server.daemon_threads = True
+        self.server.api = self
+        self.port = self.server.server_address[1]
+        self.allowedHosts = {f"{name}:{self.port}".lower() for name in self.allowedNames}
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="automation-api", daemon=True
+        )
+        self.thread.start()
+        self.logger.info(f"automation api listening on http://{self.host}:{self.port}")
+
+    def stop(self) -> None:
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.server = None
+        self.thread = None
+
+    def is_allowed_host(self, host) -> bool:
+        return (host or "").lower() in self.allowedHosts
+
+    def get_cameras(self) -> dict:
+        return {"cameras": self.driver_management.get_socket_cameras()}
+
+    def get_discovery(self) -> dict:
+        infos = self.driver_management.get_socket_search_result()
+        return {"cameras": [info_to_dict(info) for info in infos]}
+
+    def get_frame(self, camera):
+        return self.driver_management.get_socket_latest_frame(camera)
+
+    # 命令格式与SocketManagement.handle_message相同, 返回(future, command)
+    def submit(self, command_data: dict):
+        if not isinstance(command_data, dict):
+            raise ApiError(400, "command must be an object")
+        try:
+            future = self.driver_management.socket_command(command_data)
+        except (TypeError, ValueError) as e:
+            raise ApiError(400, str(e))
+        return future, command_data["command"]
+
+    def wait(self, future, command, wait=None, timeout=None) -> dict:
+        if wait is None:
+            wait = command not in NO_WAIT_COMMANDS
+        if not wait:
+            return {"command": command, "ok": True, "accepted": True}
+
+        if timeout is None:
+            timeout = COMMAND_TIMEOUTS.get(command, 5.0) + RESULT_GRACE
+        try:
+            result = future.result(timeout)
+        except CancelledError:
+            return {"command": command, "ok": False, "error": "cancelled"}
+        except (FutureTimeoutError, TimeoutError):
+            return {"command": command, "ok": False, "error": "timeout"}
+        except Exception as e:
+            return {"command": command, "ok": False, "error": str(e)}
+
+        return {
+            "command": command,
+            "ok": result is not None and result is not False,
+            "result": decode_result(command, result),
+        }
+
+    def execute(self, command_data: dict, wait=None, timeout=None) -> dict:
+        future, command = self.submit(command_data)
+        return self.wait(future, command, wait, timeout)
+
+    # 先提交所有命令, 不同摄像头的命令在各自的通道中并发执行, 再依次收集结果
+    # 单条命令可用"cameras"列表展开到多个摄像头
+    def execute_batch(self, commands, wait=None, timeout=None) -> list:
+        if not isinstance(commands, list):
+            raise ApiError(400, "commands must be a list")
+
+        expanded = []
+        for command_data in commands:
+            if isinstance(command_data, dict) and "cameras" in command_data:
+                cameras = command_data["cameras"]
+                if not isinstance(cameras, list) or not all(
+                    isinstance(camera, str) for camera in cameras
+                ):
+                    raise ApiError(400, "cameras must be a list of strings")
+                for camera in cameras:
+                    item = dict(command_data, camera=camera)
+                    del item["cameras"]
+                    expanded.append(item)
+            else:
+                expanded.append(command_data)
+
+        # 全部检查通过后再提交, 错误的参数不会发到任何摄像头
+        for command_data in expanded:
+            if isinstance(command_data, dict):
+                for key in JSON_TEXT_FIELDS:
+                    if key in command_data:
+                        command_data[key] = encode_json_text(command_data[key], key)
+
+        submitted = []
+        for command_data in expanded:
+            if not isinstance(command_data, dict):
+                command_data = {}
+            camera = command_data.get("camera")
+            try:
+                submitted.append((camera, *self.submit(command_data), None))
+            except ApiError as e:
+                submitted.append((camera, None, command_data.get("command"), e.message))
+
+        results = []
+        for camera, future, command, error in submitted:
+            if error is not None:
+                result = {"command": command, "ok": False, "error": error}
+            else:
+                result = self.wait(future, command, wait, timeout)
+            result["camera"] = camera
+            results.append(result)
+        return results
+
+
+class AutomationRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "CameraCollector"
+
+    # (方法, 路径, 处理函数名), 路径中的camera为"ip:port"
+    routes = (
+        ("GET", r"/api/cameras", "get_cameras"),
+        ("GET", r"/api/discovery", "get_discovery"),
+        ("POST", r"/api/connect", "post_connect"),
+        ("POST", r"/api/batch", "post_batch"),
+        ("POST", r"/api/batch/(?P<command>\w+)", "post_batch_command"),
+        ("GET", r"/api/cameras/(?P<camera>[^/]+)/config", "get_config"),
+        ("POST", r"/api/cameras/(?P<camera>[^/]+)/config", "post_config"),
+        ("POST", r"/api/cameras/(?P<camera>[^/]+)/control", "post_control"),
+        ("POST", r"/api/cameras/(?P<camera>[^/]+)/restart", "post_restart"),
+        ("POST", r"/api/cameras/(?P<camera>[^/]+)/upgrade", "post_upgrade"),
+        ("POST", r"/api/cameras/(?P<camera>[^/]+)/disconnect", "post_disconnect"),
+        ("GET", r"/api/cameras/(?P<camera>[^/]+)/frame", "get_frame"),
+    )
+    compiledRoutes = tuple(
+        (method, re.compile(pattern + "$"), name) for method, pattern, name in routes
+    )
+
+    def do_GET(self) -> None:
+        self.dispatch("GET")
+
+    def do_POST(self) -> None:
+        self.dispatch("POST")
+
+    def log_message(self, format, *args) -> None:
+        self.server.api.logger.debug(f"automation api {self.address_string()} {format % args}")
+
+    def dispatch(self, method) -> None:
+        url = urlsplit(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            self.check_request(method)
+            for routeMethod, pattern, name in self.compiledRoutes:
+                match = pattern.match(url.path)
+                if match and routeMethod == method:
+                    kwargs = {key: unquote(value) for key, value in match.groupdict().items()}
+                    getattr(self, name)(**kwargs)
+                    return
+            raise ApiError(404, f"no route for {method} {url.path}")
+        except ApiError as e:
+            # 请求体可能未读取, 不再复用该连接
+            self.close_connection = True
+            self.send_json({"ok": False, "error": e.message}, e.status)
+        except Exception as e:
+            self.server.api.logger.error(f"automation api error: {e}")
+            self.send_json({"ok": False, "error": str(e)}, 500)
+
+    # POST只接受application/json, 浏览器跨站发送时必须先经过CORS预检
+    def check_request(self, method) -> None:
+        if not self.server.api.is_allowed_host(self.headers.get("Host")):
+            raise ApiError(403, f"host not allowed: {self.headers.get('Host')}")
+        if method == "POST" and self.headers.get_content_type() != "application/json":
+            raise ApiError(415, "content type must be application/json")
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, "request body too large")
+        if length == 0:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            raise ApiError(400, f"invalid json: {e}")
+        if not isinstance(body, dict):
+            raise ApiError(400, "request body must be an object")
+        return body
+
+    def send_body(self, body: bytes, content_type: str, status=200, headers=None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data, status=200) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_body(body, "application/json; charset=utf-8", status)
+
+    def get_wait(self, body=None):
+        value = (body or {}).get("wait", self.query.get("wait"))
+        return None if value is None else parse_bool(value)
+
+    def get_timeout(self, body=None):
+        value = (body or {}).get("timeout", self.query.get("timeout"))
+        try:
+            return None if value is None else float(value)
+        except (TypeError, ValueError):
+            raise ApiError(400, f"invalid timeout: {value}")
+
+    def run_command(self, command_data: dict, body=None) -> None:
+        api = self.server.api
+        result = api.execute(command_data, self.get_wait(body), self.get_timeout(body))
+        result["camera"] = command_data.get("camera")
+        status = 200 if result["ok"] else 504 if result.get("error") == "timeout" else 502
+        self.send_json(result, status)
+
+    def get_cameras(self) -> None:
+        self.send_json(self.server.api.get_cameras())
+
+    def get_discovery(self) -> None:
+        self.send_json(self.server.api.get_discovery())
+
+    def post_connect(self) -> None:
+        body = self.read_json()
+        try:
+            ip, port = body["ip"], int(body["port"])
+        except (KeyError, TypeError, ValueError):
+            raise ApiError(400, "ip and port are required")
+        self.run_command(
+            {"command": SocketCommand.CONNECT.value, "ip": ip, "port": port}, body
+        )
+
+    def get_config(self, camera) -> None:
+        self.run_command({"command": SocketCommand.GET_CONFIG.value, "camera": camera})
+
+    def post_config(self, camera) -> None:
+        body = self.read_json()
+        # 未使用"config"字段时整个请求体即为配置
+        if "config" in body:
+            config = body["config"]
+        else:
+            config = {key: value for key, value in body.items() if key not in REQUEST_OPTIONS}
+        config = encode_json_text(config, "config")
+        self.run_command(
+            {"command": SocketCommand.SET_CONFIG.value, "camera": camera, "config": config},
+            body,
+        )
+
+    def post_control(self, camera) -> None:
+        body = self.read_json()
+        if "control" not in body:
+            raise ApiError(400, "control is required")
+        self.run_command(
+            {
+                "command": SocketCommand.CONTROL.value,
+                "camera": camera,
+                "control": encode_json_text(body["control"], "control"),
+            },
+            body,
+        )
+
+    def post_restart(self, camera) -> None:
+        body = self.read_json()
+        self.run_command({"command": SocketCommand.RESTART.value, "camera": camera}, body)
+
+    def post_upgrade(self, camera) -> None:
+        body = self.read_json()
+        if "filePath" not in body:
+            raise ApiError(400, "filePath is required")
+        self.run_command(
+            {
+                "command": SocketCommand.UPGRADE.value,
+                "camera": camera,
+                "filePath": body["filePath"],
+            },
+            body,
+        )
+
+    def post_disconnect(self, camera) -> None:
+        body = self.read_json()
+        self.run_command(
+            {"command": SocketCommand.DISCONNECT.value, "camera": camera}, body
+        )
+
+    def get_frame(self, camera) -> None:
+        frame = self.server.api.get_frame(camera)
+        if frame is None:
+            raise ApiError(404, f"no frame for {camera}")
+        self.send_body(
+            frame.data,
+            "image/jpeg",
+            headers={
+                "X-Camera": frame.camera,
+                "X-Sequence": str(frame.sequence),
+                "X-Timestamp": f"{frame.timestamp:.6f}",
+            },
+        )
+
+    # {"commands": [{"command": "get_config", "camera": "ip:port"}, ...]}
+    def post_batch(self) -> None:
+        body = self.read_json()
+        results = self.server.api.execute_batch(
+            body.get("commands"), self.get_wait(body), self.get_timeout(body)
+        )
+        self.send_json({"ok": all(r["ok"] for r in results), "results": results})
+
+    # 同一命令作用于多个摄像头, 未指定cameras时为所有已连接的摄像头
+    def post_batch_command(self, command) -> None:
+        body = self.read_json()
+        if "cameras" in body:
+            cameras = body["cameras"]
+        else:
+            cameras = self.server.api.get_cameras()["cameras"]
+        commandData = {
+            key: value
+            for key, value in body.items()
+            if key != "cameras" and key not in REQUEST_OPTIONS
+        }
+        commandData.update(command=command, cameras=cameras)
+        results = self.server.api.execute_batch(
+            [commandData], self.get_wait(body), self.get_timeout(body)
+        )
+        self.send_json({"ok": all(r["ok"] for r in results), "results": results})
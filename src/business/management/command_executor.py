@@ -0,0 +1,226 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+from src.log import log
+
+MAX_WORKERS = 8
+
+# 数值越小越先执行
+PRIORITY_URGENT = 0
+PRIORITY_HIGH = 1
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 3
+
+
+class CommandTask:
+    def __init__(
+        self, camera, fn, args, exclusive, timeout, on_timeout, priority, coalesce_key
+    ) -> None:
+        self.camera = camera
+        self.fn = fn
+        self.args = args
+        self.exclusive = exclusive
+        self.timeout = timeout
+        self.on_timeout = on_timeout
+        self.priority = priority
+        self.coalesce_key = coalesce_key
+        self.future = Future()
+
+
+# 待执行命令按(优先级, 提交顺序)排列; 相同coalesce_key的待执行命令合并为一个, 中间有独占命令时不合并
+class CommandLane:
+    def __init__(self) -> None:
+        self.pending = []
+        self.coalesced = {}
+        self.running_shared = 0
+        self.running_exclusive = False
+
+    def push(self, task: CommandTask, order: int) -> None:
+        heapq.heappush(self.pending, (task.priority, order, task))
+        # 写操作之后提交的命令要看到写入的结果, 不能再合并到之前排队的命令上
+        if task.exclusive:
+            self.coalesced.clear()
+        if task.coalesce_key is not None:
+            self.coalesced[task.coalesce_key] = task
+
+    def peek(self) -> CommandTask:
+        return self.pending[0][2]
+
+    def pop(self) -> CommandTask:
+        task = heapq.heappop(self.pending)[2]
+        if self.coalesced.get(task.coalesce_key) is task:
+            del self.coalesced[task.coalesce_key]
+        return task
+
+    def can_start(self, task: CommandTask) -> bool:
+        if task.exclusive:
+            return not self.running_exclusive and self.running_shared == 0
+        return not self.running_exclusive
+
+    def is_idle(self) -> bool:
+        return not self.pending and not self.running_exclusive and self.running_shared == 0
+
+
+# 不同摄像头的命令并发执行; 同一摄像头上独占命令(写操作)串行, 共享命令(读操作)可并发
+class CommandExecutor:
+    def __init__(self, max_workers: int = MAX_WORKERS) -> None:
+        self.logger = log.get_logger()
+        self.pool = ThreadPoolExecutor(max_workers, thread_name_prefix="command")
+        self.lanes = {}
+        self.lock = threading.Lock()
+        self.orderCounter = itertools.count()
+
+        self.deadlines = []
+        self.deadlineCounter = itertools.count()
+        self.deadlineCond = threading.Condition()
+        self.running = True
+        self.watchdog = threading.Thread(
+            target=self._watch_deadlines, name="command-watchdog", daemon=True
+        )
+        self.watchdog.start()
+
+    def submit(
+        self,
+        camera,
+        fn,
+        *args,
+        exclusive: bool = True,
+        timeout: Optional[float] = None,
+        on_timeout=None,
+        priority: int = PRIORITY_NORMAL,
+        coalesce_key=None,
+    ) -> Future:
+        with self.lock:
+            lane = self.lanes.get(camera)
+            if lane is None:
+                lane = self.lanes[camera] = CommandLane()
+
+            # 已有相同的命令在排队时直接共用其结果
+            pending = lane.coalesced.get(coalesce_key) if coalesce_key is not None else None
+            if pending is not None and not pending.future.done():
+                return pending.future
+
+            task = CommandTask(
+                camera, fn, args, exclusive, timeout, on_timeout, priority, coalesce_key
+            )
+            lane.push(task, next(self.orderCounter))
+            ready = self._take_ready(lane)
+
+        for ready_task in ready:
+            self._start(ready_task)
+        return task.future
+
+    # 取消摄像头上所有尚未开始的命令
+    def cancel_pending(self, camera) -> int:
+        with self.lock:
+            lane = self.lanes.get(camera)
+            if lane is None:
+                return 0
+            tasks = [task for _, _, task in lane.pending]
+            lane.pending.clear()
+            lane.coalesced.clear()
+            if lane.is_idle():
+                del self.lanes[camera]
+
+        for task in tasks:
+            task.future.cancel()
+        return len(tasks)
+
+    def shutdown(self) -> None:
+        with self.deadlineCond:
+            self.running = False
+            self.deadlineCond.notify()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    # 按优先级取出可以立即执行的命令, 需持有self.lock
+    def _take_ready(self, lane: CommandLane) -> list:
+        ready = []
+        while lane.pending and lane.can_start(lane.peek()):
+            task = lane.pop()
+            if task.exclusive:
+                lane.running_exclusive = True
+            else:
+                lane.running_shared += 1
+            ready.append(task)
+        return ready
+
+    def _start(self, task: CommandTask) -> None:
+        if task.timeout is not None:
+            with self.deadlineCond:
+                heapq.heappush(
+                    self.deadlines,
+                    (time.monotonic() + task.timeout, next(self.deadlineCounter), task),
+                )
+                self.deadlineCond.notify()
+
+        try:
+            self.pool.submit(self._run, task)
+        except RuntimeError as e:
+            self._set_exception(task, e)
+            self._finish(task)
+
+    def _run(self, task: CommandTask) -> None:
+        try:
+            # 排队期间已取消或超时的命令不再执行
+            if not task.future.done():
+                self._set_result(task, task.fn(*task.args))
+        except Exception as e:
+            self.logger.error(f"command {getattr(task.fn, '__name__', task.fn)} error: {e}")
+            self._set_exception(task, e)
+        finally:
+            self._finish(task)
+
+    def _finish(self, task: CommandTask) -> None:
+        with self.lock:
+            lane = self.lanes[task.camera]
+            if task.exclusive:
+                lane.running_exclusive = False
+            else:
+                lane.running_shared -= 1
+            ready = self._take_ready(lane)
+            if lane.is_idle():
+                del self.lanes[task.camera]
+
+        for ready_task in ready:
+            self._start(ready_task)
+
+    def _set_result(self, task: CommandTask, result) -> None:
+        # 已超时的命令结果直接丢弃
+        if not task.future.done():
+            try:
+                task.future.set_result(result)
+            except Exception:
+                pass
+
+    def _set_exception(self, task: CommandTask, exception) -> bool:
+        if task.future.done():
+            return False
+        try:
+            task.future.set_exception(exception)
+            return True
+        except Exception:
+            return False
+
+    def _watch_deadlines(self) -> None:
+        while True:
+            with self.deadlineCond:
+                while self.running and (
+                    not self.deadlines or self.deadlines[0][0] > time.monotonic()
+                ):
+                    wait = self.deadlines[0][0] - time.monotonic() if self.deadlines else None
+                    self.deadlineCond.wait(wait)
+                if not self.running:
+                    return
+                _, _, task = heapq.heappop(self.deadlines)
+
+            if task.future.done():
+                continue
+
+            name = getattr(task.fn, "__name__", task.fn)
+            if self._set_exception(task, TimeoutError(f"command {name} timeout")):
+                self.logger.error(f"command {name} on {task.camera} timeout.")
+                if task.on_timeout:
+                    task.on_timeout()
@@ -1,5 +1,8 @@
-from json import loads
-from typing import List
+import os
+import threading
+from datetime import datetime
+from concurrent.futures import Future
+from typing import List, Optional
 from PyQt6.QtCore import QObject, pyqtSignal
 
 from src.business.management.socket.socket_management_command import (
@@ -8,13 +11,22 @@ from src.business.management.socket.socket_management_command import (
     SocketUpgradeCommand,
     SocketGetConfigCommand,
     SocketSetConfigCommand,
+    SocketControlCommand,
     SocketRestartCommand,
+    create_socket_command,
 )
+from src.common.frame.camera_frame import CameraFrame
+from src.common.frame.frame_mailbox import FrameMailbox
+from src.common.frame.frame_recorder import FrameRecorder, get_camera_dir
+from src.common.frame.frame_ring import FrameRingStore, export_frames
 from src.common.thread.create_thread import create_and_start_thread
 from src.driver.driver_socket.camera_socket.camera_search import SearchSocket
 from src.log import log
 from src.business.management.socket.socket_management import SocketManagement
 
+# 退出时等待后台线程结束的最长时间(毫秒)
+THREAD_STOP_TIMEOUT = 3000
+
 
 class DriverManagement(QObject):
     control_serial_signal = pyqtSignal(str)
@@ -27,6 +39,8 @@ class DriverManagement(QObject):
         display_socket_picture_signal,
         display_socket_config_signal,
         display_socket_search_signal,
+        display_socket_upgrade_progress_signal,
+        display_socket_analytics_signal=None,
     ) -> None:
         super(DriverManagement, self).__init__(parent)
 
@@ -35,38 +49,232 @@ class DriverManagement(QObject):
         self.display_socket_picture_signal = display_socket_picture_signal
         self.display_socket_config_signal = display_socket_config_signal
         self.display_socket_search_signal = display_socket_search_signal
+        self.display_socket_upgrade_progress_signal = (
+            display_socket_upgrade_progress_signal
+        )
+        self.display_socket_analytics_signal = display_socket_analytics_signal
 
         self.logger = log.get_logger()
+        self.pictureMailbox = FrameMailbox()
+        self.pictureSequence = {}
+        # 依赖cv2/numpy的模块在首次使用时才导入
+        self.changeDetector = None
+        self.skipStaticRecording = False
+        self.frameRing = FrameRingStore()
+        self.frameRecorder = FrameRecorder()
+        self.videoRecorder = None
+        self.frameAnalytics = None
+        self.frameSinks = [self.frameRecorder]
 
         self.start_socket_management_thread()
         self.start_socket_search_thread()
 
-    def deleteLater(self):
-        self.socketManagementQThread.quit()
-        self.socketManagementQThread.quit()
+    # 退出时由界面显式调用: 先停止接收和命令执行, 再让帧输出写完排队的帧并关闭文件, 最后结束线程
+    def shutdown(self) -> None:
+        self.socketManagement.stop()
+        # 变化检测先停止, 排队的帧判定后仍会交给帧输出
+        if self.changeDetector is not None:
+            self.changeDetector.stop()
+        for sink in self.frameSinks:
+            sink.stop()
+        for qThread in (self.socketManagementQThread, self.socketSearchQThread):
+            qThread.quit()
+            if not qThread.wait(THREAD_STOP_TIMEOUT):
+                self.logger.warning("thread did not stop in time")
 
     def notify_warning(self, warning) -> None:
         self.display_warning_signal.emit(warning)
 
-    def handle_message(self, message: str) -> None:
-        message_dict = loads(message)
-        if message_dict["driver"] == "socket":
-            self.socketManagement.control_signal.emit(message)
+    # 命令对象直接提交到执行器, 返回Future
+    def handle_message(self, command) -> Optional[Future]:
+        if command.driver == "socket":
+            return self.socketManagement.submit(command)
+        return None
+
+    # 对外接口的JSON命令, 参数错误时抛出ValueError
+    def socket_command(self, command_data: dict) -> Optional[Future]:
+        return self.handle_message(create_socket_command(command_data))
+
+    def get_socket_cameras(self) -> list:
+        return self.socketManagement.get_cameras()
+
+    def get_socket_search_result(self) -> list:
+        return self.socketSearch.get_socket_infos()
+
+    def get_socket_latest_frame(self, camera) -> Optional[CameraFrame]:
+        return self.frameRing.get_latest(camera)
 
     def display_warning_event(self, warning) -> None:
         self.display_warning_signal.emit(warning)
 
-    def display_socket_status_change_event(self, status) -> None:
-        self.display_socket_status_change_signal.emit(status)
+    # 摄像头断开后释放其预览信箱
+    def display_socket_status_change_event(self, camera, status) -> None:
+        if not status:
+            self.pictureMailbox.remove(camera)
+        self.display_socket_status_change_signal.emit(camera, status)
+
+    def display_socket_picture_event(self, camera, image, meta=None) -> None:
+        sequence = self.pictureSequence.get(camera, 0) + 1
+        self.pictureSequence[camera] = sequence
+
+        # 接收线程中只比较校验和, 与上一帧完全相同时不重绘, 可选不录制
+        detector = self.changeDetector
+        duplicate = detector is not None and detector.is_duplicate(camera, image)
+        if duplicate and self.skipStaticRecording:
+            return
+
+        # image为接收缓冲区的memoryview, 跨线程前拷贝一次
+        frame = CameraFrame(camera, bytes(image), meta, sequence)
+        self.frameRing.put(camera, image, sequence, frame.timestamp, meta)
+
+        # 缩略图比较在变化检测线程中进行, 跳过静止帧录制时由其判定后再交给帧输出
+        detecting = not duplicate and detector is not None and detector.enabled
+        if not (detecting and self.skipStaticRecording):
+            self.put_socket_frame(frame)
+        if duplicate:
+            return
+        if detecting:
+            detector.put(frame)
+        else:
+            self.display_socket_frame(frame)
+
+    # 在变化检测线程中调用
+    def display_socket_change_event(self, frame, changed) -> None:
+        if not changed:
+            return
+        if self.skipStaticRecording:
+            self.put_socket_frame(frame)
+        self.display_socket_frame(frame)
+
+    def put_socket_frame(self, frame) -> None:
+        for sink in self.frameSinks:
+            sink.put(frame)
+
+    # 界面处理不过来时只保留最新一帧, 信箱由空变非空时才通知界面
+    def display_socket_frame(self, frame) -> None:
+        if self.pictureMailbox.put(frame):
+            self.display_socket_picture_signal.emit(frame.camera)
+
+    def take_socket_picture(self, camera) -> Optional[CameraFrame]:
+        return self.pictureMailbox.take(camera)
+
+    def get_socket_picture_dropped(self, camera) -> int:
+        return self.pictureMailbox.get_dropped(camera)
+
+    def get_socket_picture_skipped(self, camera) -> int:
+        if self.changeDetector is None:
+            return 0
+        return self.changeDetector.get_skipped(camera)
+
+    def set_socket_change_detection(
+        self, enabled: bool, threshold=None, skip_recording=None
+    ) -> None:
+        if self.changeDetector is None:
+            if not enabled:
+                return
+            from src.common.image.change_detector import ChangeDetector
+
+            self.changeDetector = ChangeDetector(
+                on_result=self.display_socket_change_event
+            )
+            self.changeDetector.start()
+
+        if threshold is not None:
+            self.changeDetector.set_threshold(threshold)
+        if skip_recording is not None:
+            self.skipStaticRecording = skip_recording
+        # 只决定是否重绘时每个摄像头判定最新一帧即可, 跳过静止帧录制时每帧都要判定
+        self.changeDetector.set_lossless(self.skipStaticRecording)
+        self.changeDetector.set_enabled(enabled)
 
-    def display_socket_picture_event(self, image) -> None:
-        self.display_socket_picture_signal.emit(image)
+    def start_socket_recording(self) -> None:
+        self.frameRecorder.start()
 
-    def display_socket_config_event(self, config) -> None:
-        self.display_socket_config_signal.emit(config)
+    def stop_socket_recording(self) -> None:
+        self.frameRecorder.stop()
 
-    def display_socket_search_event(self, result) -> None:
-        self.display_socket_search_signal.emit(result)
+    def is_socket_recording(self) -> bool:
+        return self.frameRecorder.is_recording()
+
+    # 每个摄像头回放缓存的上限(字节), 为0时不缓存, 最新帧接口也随之不可用
+    def set_socket_replay_capacity(self, capacity: int) -> None:
+        self.frameRing.set_capacity(capacity)
+
+    def get_socket_replay_frame(self, camera, timestamp) -> Optional[CameraFrame]:
+        return self.frameRing.get_at(camera, timestamp)
+
+    def get_socket_replay_range(self, camera) -> Optional[tuple]:
+        return self.frameRing.get_range(camera)
+
+    # 立即拷贝出最近seconds秒的帧, 写盘在后台线程中进行
+    def export_socket_replay(self, camera, seconds: float) -> int:
+        frames = self.frameRing.get_recent(camera, seconds)
+        if not frames:
+            return 0
+
+        currentTime = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        directory = os.path.join(
+            "images", f"replay_{get_camera_dir(camera)}_{currentTime}"
+        )
+        threading.Thread(
+            target=self._export_socket_replay,
+            args=(frames, directory),
+            name="replay-export",
+            daemon=True,
+        ).start()
+        return len(frames)
+
+    def _export_socket_replay(self, frames, directory) -> None:
+        try:
+            export_frames(frames, directory)
+            self.logger.info(f"导出回放{len(frames)}帧到{directory}")
+        except Exception as e:
+            self.display_warning_signal.emit(f"导出回放失败: {str(e)}")
+
+    # interval > 0 时为延时摄影
+    def start_socket_video(self, interval: float = 0.0) -> None:
+        if self.videoRecorder is None:
+            from src.common.frame.video_recorder import VideoRecorder
+
+            self.videoRecorder = VideoRecorder()
+            self.frameSinks.append(self.videoRecorder)
+
+        self.videoRecorder.set_interval(interval)
+        self.videoRecorder.start()
+
+    def stop_socket_video(self) -> None:
+        if self.videoRecorder is not None:
+            self.videoRecorder.stop()
+
+    def display_socket_analytics_event(self, frame, results) -> None:
+        if self.display_socket_analytics_signal is not None:
+            self.display_socket_analytics_signal.emit(
+                frame.camera, frame.sequence, results
+            )
+
+    def get_socket_analytics(self, camera):
+        if self.frameAnalytics is None:
+            return None
+        return self.frameAnalytics.get_result(camera)
+
+    def start_socket_analytics(self) -> None:
+        if self.frameAnalytics is None:
+            from src.common.image.frame_analytics import FrameAnalytics
+
+            self.frameAnalytics = FrameAnalytics(
+                on_result=self.display_socket_analytics_event
+            )
+            self.frameSinks.append(self.frameAnalytics)
+        self.frameAnalytics.start()
+
+    def display_socket_config_event(self, camera, config) -> None:
+        self.display_socket_config_signal.emit(camera, config)
+
+    def display_socket_search_event(self, event, uuid, ip_port) -> None:
+        self.display_socket_search_signal.emit(event, uuid, ip_port)
+
+    def display_socket_upgrade_progress_event(self, camera, sent, total, speed) -> None:
+        self.display_socket_upgrade_progress_signal.emit(camera, sent, total, speed)
 
     def start_socket_management_thread(self) -> None:
         self.socketManagement = SocketManagement()
@@ -75,33 +283,38 @@ class DriverManagement(QObject):
             self.display_socket_status_change_event,
             self.display_socket_picture_event,
             self.display_socket_config_event,
+            self.display_socket_upgrade_progress_event,
         )
 
         self.socketManagementQThread = create_and_start_thread(self.socketManagement)
 
-    def socket_connect(self, ip: str, port: int) -> None:
+    def socket_connect(self, ip: str, port: int) -> Future:
         invoker = SocketConnectCommand(ip, port)
-        invoker.execute(self.handle_message)
+        return invoker.execute(self.handle_message)
+
+    def socket_disconnect(self, camera=None) -> Future:
+        invoker = SocketDisconnectCommand(camera)
+        return invoker.execute(self.handle_message)
 
-    def socket_disconnect(self) -> None:
-        invoker = SocketDisconnectCommand()
-        invoker.execute(self.handle_message)
+    def socket_upgrade(self, filePath, camera=None) -> Future:
+        invoker = SocketUpgradeCommand(filePath, camera)
+        return invoker.execute(self.handle_message)
 
-    def socket_upgrade(self, filePath) -> None:
-        invoker = SocketUpgradeCommand(filePath)
-        invoker.execute(self.handle_message)
+    def socket_get_config(self, camera=None) -> Future:
+        invoker = SocketGetConfigCommand(camera)
+        return invoker.execute(self.handle_message)
 
-    def socket_get_config(self) -> None:
-        invoker = SocketGetConfigCommand()
-        invoker.execute(self.handle_message)
+    def socket_set_config(self, config, camera=None) -> Future:
+        invoker = SocketSetConfigCommand(config, camera)
+        return invoker.execute(self.handle_message)
 
-    def socket_set_config(self, config) -> None:
-        invoker = SocketSetConfigCommand(config)
-        invoker.execute(self.handle_message)
+    def socket_control(self, control, camera=None) -> Future:
+        invoker = SocketControlCommand(control, camera)
+        return invoker.execute(self.handle_message)
 
-    def socket_restart(self) -> None:
-        invoker = SocketRestartCommand()
-        invoker.execute(self.handle_message)
+    def socket_restart(self, camera=None) -> Future:
+        invoker = SocketRestartCommand(camera)
+        return invoker.execute(self.handle_message)
 
     def start_socket_search_thread(self):
         self.socketSearch = SearchSocket()
@@ -1,8 +1,8 @@
 from abc import ABC, abstractmethod
-from PyQt6.QtCore import pyqtBoundSignal
 
 
 class ManagementCommandBase(ABC):
+    # handle接收命令对象本身, 返回值原样返回
     @abstractmethod
-    def execute(self, signal: pyqtBoundSignal) -> None:
+    def execute(self, handle):
         pass
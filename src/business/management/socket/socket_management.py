@@ -1,23 +1,60 @@
 import json
+import threading
+from concurrent.futures import Future
+from functools import partial
 from PyQt6.QtCore import Qt, QThread, QObject, pyqtSignal, pyqtSlot
-from src.common.thread.create_thread import create_and_start_thread
 from src.log import log
 from src.driver.driver_factory import SOCKET_PRODUCT, DriverFactory
-from src.business.management.socket.socket_management_command import SocketCommand
+from src.business.management.command_executor import CommandExecutor
+from src.business.management.socket.socket_management_command import (
+    SocketCommand,
+    SocketManagementCommandBase,
+    SocketPingCommand,
+    create_socket_command,
+)
 from src.driver.driver_socket.camera_socket.camera_server import CameraServer
 
+# 各命令的超时时间(秒)
+COMMAND_TIMEOUTS = {
+    SocketCommand.CONNECT.value: 10.0,
+    SocketCommand.DISCONNECT.value: 5.0,
+    SocketCommand.GET_CONFIG.value: 5.0,
+    SocketCommand.SET_CONFIG.value: 5.0,
+    SocketCommand.CONTROL.value: 5.0,
+    SocketCommand.UPGRADE.value: 600.0,
+    SocketCommand.PING.value: 3.0,
+    SocketCommand.RESTART.value: 5.0,
+}
 
-class SocketManagement(QObject):
-    control_signal = pyqtSignal(str)
+# 等待接收线程退出的最长时间(秒)
+SERVER_STOP_TIMEOUT = 2.0
+
+# 只读命令, 同一摄像头上可以并发执行
+SHARED_COMMANDS = (
+    SocketCommand.PING.value,
+    SocketCommand.GET_CONFIG.value,
+)
+
+
+def get_camera_key(ip, port) -> str:
+    return f"{ip}:{port}"
 
+
+class SocketManagement(QObject):
     def __init__(self, parent=None) -> None:
         super(SocketManagement, self).__init__(parent)
 
         self.logger = log.get_logger()
         self.timerList = []
         self.timer = None
-        self.cameraSocket = None
-        self.pingFailCounter = 0
+        self.server = None
+        self.serverThread = None
+
+        # 摄像头: "ip:port" -> CameraSocket
+        self.cameraSockets = {}
+        self.pingFailCounters = {}
+        self.camerasLock = threading.Lock()
+        self.executor = CommandExecutor()
 
         self.command_handlers = {
             SocketCommand.CONNECT.value: self.connect,
@@ -26,6 +63,7 @@ class SocketManagement(QObject):
             SocketCommand.SET_CONFIG.value: self.set_config,
             SocketCommand.CONTROL.value: self.control,
             SocketCommand.UPGRADE.value: self.upgrade,
+            SocketCommand.PING.value: self.ping,
             SocketCommand.RESTART.value: self.restart,
         }
 
@@ -35,11 +73,13 @@ class SocketManagement(QObject):
         notify_status_change,
         notify_socket_picture,
         notify_socket_config,
+        notify_socket_upgrade_progress=None,
     ) -> None:
         self.notify_warning_callback = notify_warning
         self.notify_socket_status_change_callback = notify_status_change
         self.notify_socket_picture_callback = notify_socket_picture
         self.notify_socket_config_callback = notify_socket_config
+        self.notify_socket_upgrade_progress_callback = notify_socket_upgrade_progress
 
     def timerEvent(self, event):
         for timer, call in self.timerList:
@@ -48,15 +88,16 @@ class SocketManagement(QObject):
 
     @pyqtSlot()
     def run(self) -> None:
-        self.control_signal.connect(self.handle_message)
-
         # 增加Qtimer
         self.timer_ping = self.startTimer(5000)
-        self.timerList.append((self.timer_ping, self.ping))
+        self.timerList.append((self.timer_ping, self.ping_all))
 
         self.server = CameraServer()
         self.server.set_callback(self.notify_socket_picture_callback)
-        self.serverQThread = create_and_start_thread(self.server)
+        self.serverThread = threading.Thread(
+            target=self.server.run, name="camera-server", daemon=True
+        )
+        self.serverThread.start()
 
         self.thread().exec()
 
@@ -66,169 +107,229 @@ class SocketManagement(QObject):
         for timer, _ in self.timerList:
             self.killTimer(timer)
         self.timerList.clear()
-
-    def connect(self, ip, port) -> None:
+        self.stop()
+
+    # 可在任意线程中调用, 多次调用无副作用
+    def stop(self) -> None:
+        self.executor.shutdown()
+        if self.server is not None:
+            self.server.stop()
+            self.serverThread.join(SERVER_STOP_TIMEOUT)
+
+    def get_cameras(self) -> list:
+        with self.camerasLock:
+            return list(self.cameraSockets.keys())
+
+    def get_camera_socket(self, camera):
+        with self.camerasLock:
+            return self.cameraSockets.get(camera)
+
+    # 提交到执行器, 除连接外的命令都需指定摄像头, 界面和自动化接口各自管理目标摄像头
+    def submit(self, command: SocketManagementCommandBase) -> Future:
+        name = command.command.value
+        args = command.get_args()
+        if command.command == SocketCommand.CONNECT:
+            camera = get_camera_key(*args)
+        else:
+            camera = command.camera
+
+        # 断开连接时排队中的命令已无意义
+        if command.command == SocketCommand.DISCONNECT:
+            self.executor.cancel_pending(camera)
+
+        return self.executor.submit(
+            camera,
+            self.command_handlers[name],
+            camera,
+            *args,
+            exclusive=name not in SHARED_COMMANDS,
+            timeout=COMMAND_TIMEOUTS.get(name),
+            on_timeout=partial(self._handle_timeout, name, camera),
+            priority=command.priority,
+            coalesce_key=(name, *args) if command.coalesce else None,
+        )
+
+    def connect(self, camera, ip, port) -> bool:
         try:
-            self.cameraSocket = DriverFactory.create(SOCKET_PRODUCT, ip, port)
-            if self.cameraSocket is None:
+            cameraSocket = DriverFactory.create(SOCKET_PRODUCT, ip, port)
+            if cameraSocket is None:
                 self.notify_warning_callback("摄像头连接失败")
-                self.notify_socket_status_change_callback(False)
-                return
-
-            self.notify_socket_status_change_callback(True)
-            self.server.set_camera_ip(ip)
-
-            self.get_config()
-            self.pingFailCounter = 0
+                self.notify_socket_status_change_callback(camera, False)
+                return False
+
+            with self.camerasLock:
+                oldSocket = self.cameraSockets.get(camera)
+                self.cameraSockets[camera] = cameraSocket
+                self.pingFailCounters[camera] = 0
+            if oldSocket:
+                oldSocket.close()
+
+            self.notify_socket_status_change_callback(camera, True)
+            self.server.add_camera(
+                ip, camera, partial(self.notify_socket_picture_callback, camera)
+            )
+
+            self.get_config(camera)
+            return True
         except Exception as e:
-            self._handle_exception(e)
+            self._handle_exception(e, camera)
+            return False
 
-    def disconnect(self) -> None:
+    def disconnect(self, camera) -> bool:
         try:
-            if self.cameraSocket:
-                self.cameraSocket.close()
-                del self.cameraSocket
-            self.cameraSocket = None
-            self.server.set_camera_ip("")
-            self.notify_socket_status_change_callback(False)
+            self._remove_camera(camera)
+            self.notify_socket_status_change_callback(camera, False)
         except Exception as e:
             pass
+        return True
 
-    def ping(self):
-        try:
-            if self.cameraSocket:
-                if self.cameraSocket.ping():
-                    self.pingFailCounter = 0
-                    self.logger.debug("摄像头心跳成功")
-                    self.notify_socket_status_change_callback(True)
-                else:
-                    self.pingFailCounter = self.pingFailCounter + 1
+    def ping_all(self) -> None:
+        for camera in self.get_cameras():
+            self.submit(SocketPingCommand(camera))
+
+    def ping(self, camera) -> bool:
+        cameraSocket = self.get_camera_socket(camera)
+        if not cameraSocket:
+            return False
 
+        try:
+            if cameraSocket.ping():
+                with self.camerasLock:
+                    self.pingFailCounters[camera] = 0
+                self.logger.debug(f"摄像头{camera}心跳成功")
+                self.notify_socket_status_change_callback(camera, True)
+                return True
         except Exception as e:
             self.logger.error(f"发生错误: {e}")
-            self.pingFailCounter = self.pingFailCounter + 1
-
-        if self.pingFailCounter >= 4:
-            self.pingFailCounter = 0
-            if self.cameraSocket:
-                self.cameraSocket.close()
-                self.cameraSocket = None
-            self.server.set_camera_ip("")
-            self.notify_warning_callback("摄像头心跳失败")
-            self.notify_socket_status_change_callback(False)
-
-    def get_config(self) -> None:
+
+        self._ping_failed(camera)
+        return False
+
+    def _ping_failed(self, camera) -> None:
+        with self.camerasLock:
+            if camera not in self.pingFailCounters:
+                return
+            self.pingFailCounters[camera] += 1
+            if self.pingFailCounters[camera] < 4:
+                return
+
+        self._remove_camera(camera)
+        self.notify_warning_callback(f"摄像头{camera}心跳失败")
+        self.notify_socket_status_change_callback(camera, False)
+
+    def get_config(self, camera):
         try:
-            if not self.cameraSocket:
+            cameraSocket = self.get_camera_socket(camera)
+            if not cameraSocket:
                 self.notify_warning_callback("摄像头未连接")
-                return
+                return None
 
-            config = self.cameraSocket.get_config()
+            config = cameraSocket.get_config()
 
             if config == "":
                 self.notify_warning_callback("摄像头配置获取失败")
-                return
+                return None
 
             self.logger.info(f"摄像头配置: {config}")
-            self.notify_socket_config_callback(config)
+            self.notify_socket_config_callback(camera, config)
+            return config
         except Exception as e:
-            self._handle_exception(e)
+            self._handle_exception(e, camera)
+            return None
 
-    def set_config(self, config) -> None:
+    def set_config(self, camera, config) -> bool:
         try:
-            if not self.cameraSocket:
+            cameraSocket = self.get_camera_socket(camera)
+            if not cameraSocket:
                 self.notify_warning_callback("摄像头未连接")
-                return
+                return False
 
-            if not self.cameraSocket.set_config(config):
+            if not cameraSocket.set_config(config):
                 self.notify_warning_callback("摄像头配置失败")
+                return False
+            return True
         except Exception as e:
-            self._handle_exception(e)
+            self._handle_exception(e, camera)
+            return False
 
-    def control(self, control_command) -> None:
+    def control(self, camera, control_command) -> bool:
         try:
-            if not self.cameraSocket:
+            cameraSocket = self.get_camera_socket(camera)
+            if not cameraSocket:
                 self.notify_warning_callback("摄像头未连接")
-                return
+                return False
 
-            if not self.cameraSocket.control(control_command):
+            if not cameraSocket.control(control_command):
                 self.notify_warning_callback("摄像头控制失败")
+                return False
+            return True
         except Exception as e:
-            self._handle_exception(e)
+            self._handle_exception(e, camera)
+            return False
 
-    def upgrade(self, filePath) -> None:
+    def upgrade(self, camera, filePath) -> bool:
         try:
-            if not self.cameraSocket:
+            cameraSocket = self.get_camera_socket(camera)
+            if not cameraSocket:
                 self.notify_warning_callback("摄像头未连接")
-                return
-
-            with open(filePath, "rb") as f:
-                file = f.read()
-                if not self.cameraSocket.upgrade(file):
-                    self.notify_warning_callback("摄像头升级失败")
+                return False
+
+            progress = self.notify_socket_upgrade_progress_callback
+            if progress is not None:
+                progress = partial(progress, camera)
+            if not cameraSocket.upgrade(filePath, progress):
+                self.notify_warning_callback("摄像头升级失败")
+                return False
+            return True
         except Exception as e:
-            self._handle_exception(e)
+            self._handle_exception(e, camera)
+            return False
 
-    def restart(self) -> None:
+    def restart(self, camera) -> bool:
         try:
-            if not self.cameraSocket:
+            cameraSocket = self.get_camera_socket(camera)
+            if not cameraSocket:
                 self.notify_warning_callback("摄像头未连接")
-                return
+                return False
 
-            if not self.cameraSocket.restart():
+            if not cameraSocket.restart():
                 self.notify_warning_callback("摄像头重启失败")
+                return False
+            return True
         except Exception as e:
-            self._handle_exception(e)
+            self._handle_exception(e, camera)
+            return False
 
-
-    @pyqtSlot(str)
-    def handle_message(self, message) -> None:
+    # 对外接口的JSON消息, 进程内直接使用submit提交命令对象
+    def handle_message(self, message: str):
         try:
-            messageDict = json.loads(message)
-            command = messageDict.get("command")
-            handler = self.command_handlers.get(command)
-
-            if handler:
-                if command in (
-                    SocketCommand.DISCONNECT.value,
-                    SocketCommand.GET_CONFIG.value,
-                    SocketCommand.RESTART.value,
-                ):
-                    handler()
-                elif command in (
-                    SocketCommand.SET_CONFIG.value,
-                    SocketCommand.CONTROL.value,
-                    SocketCommand.UPGRADE.value,
-                ):
-                    args_mapping = {
-                        SocketCommand.SET_CONFIG.value: "config",
-                        SocketCommand.CONTROL.value: "control",
-                        SocketCommand.UPGRADE.value: "filePath",
-                    }
-                    arg_key = args_mapping.get(command)
-                    if arg_key and arg_key in messageDict:
-                        handler(messageDict[arg_key])
-                    else:
-                        self.logger.error(f"命令 '{command}' 缺少必需的参数。")
-                elif command == SocketCommand.CONNECT.value:
-                    if messageDict.get("ip") and messageDict.get("port"):
-                        handler(messageDict["ip"], messageDict["port"])
-                    else:
-                        self.logger.error(f"命令 '{command}' 缺少必需的参数。")
-                else:
-                    self.logger.error(f"未定义参数处理逻辑的命令 '{command}'.")
-            else:
-                self.logger.error(f"收到未知命令: {command}")
+            return self.submit(create_socket_command(json.loads(message)))
         except json.JSONDecodeError:
             self.logger.error("接收到无效的JSON消息。")
+        except ValueError as e:
+            self.logger.error(str(e))
         except Exception as e:
-            self._handle_exception(e)
+            self._handle_exception(e, None)
+        return None
+
+    def _remove_camera(self, camera) -> None:
+        with self.camerasLock:
+            cameraSocket = self.cameraSockets.pop(camera, None)
+            self.pingFailCounters.pop(camera, None)
+
+        if cameraSocket:
+            cameraSocket.close()
+            self.server.remove_camera(cameraSocket.ip, camera)
+
+    def _handle_timeout(self, command, camera) -> None:
+        # 心跳超时后底层请求失败时会自行计数
+        if command != SocketCommand.PING.value:
+            self.notify_warning_callback(f"摄像头命令超时: {command}")
 
-    def _handle_exception(self, exception) -> None:
+    def _handle_exception(self, exception, camera) -> None:
         self.logger.error(f"发生错误: {exception}")
-        if self.cameraSocket:
-            self.cameraSocket.close()
-            self.cameraSocket = None
-        self.server.set_camera_ip("")
         self.notify_warning_callback(f"操作失败: {exception}")
-        self.notify_socket_status_change_callback(False)
+        if camera is None:
+            return
+        self._remove_camera(camera)
+        self.notify_socket_status_change_callback(camera, False)
@@ -1,7 +1,11 @@
 from enum import Enum
 import json
-from PyQt6.QtCore import pyqtBoundSignal
 
+from src.business.management.command_executor import (
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    PRIORITY_URGENT,
+)
 from src.business.management.management_command_base import ManagementCommandBase
 
 
@@ -16,71 +20,133 @@ class SocketCommand(Enum):
     RESTART = "restart"
 
 
+# 命令对象直接在进程内传递, 只在对外接口处与JSON互相转换
 class SocketManagementCommandBase(ManagementCommandBase):
-    def _build_command(
-        self, command_name: SocketCommand, additional_data: dict = {}
-    ) -> str:
+    driver = "socket"
+    command = None
+    # 处理函数的参数名, 同时也是JSON中的字段名
+    params = ()
+    priority = PRIORITY_NORMAL
+    # 排队中的相同命令合并为一个
+    coalesce = False
+    camera = None
+
+    def get_args(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.params)
+
+    def to_dict(self) -> dict:
         command_data = {
-            "driver": "socket",
-            "command": command_name.value,
-            **additional_data,
+            "driver": self.driver,
+            "command": self.command.value,
+            **dict(zip(self.params, self.get_args())),
         }
-        return json.dumps(command_data)
+        if self.camera:
+            command_data["camera"] = self.camera
+        return command_data
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def execute(self, handle):
+        return handle(self)
 
 
 class SocketConnectCommand(SocketManagementCommandBase):
-    def __init__(self, ip: str, port: int) -> None:
+    command = SocketCommand.CONNECT
+    params = ("ip", "port")
+
+    def __init__(self, ip: str, port: int, camera=None) -> None:
         self.ip = ip
         self.port = port
-
-    def execute(self, handle) -> None:
-        message = self._build_command(
-            SocketCommand.CONNECT, {"ip": self.ip, "port": self.port}
-        )
-        handle(message)
+        self.camera = camera
 
 
 class SocketDisconnectCommand(SocketManagementCommandBase):
-    def execute(self, handle) -> None:
-        message = self._build_command(SocketCommand.DISCONNECT)
-        handle(message)
+    command = SocketCommand.DISCONNECT
+    priority = PRIORITY_URGENT
+
+    def __init__(self, camera=None) -> None:
+        self.camera = camera
 
 
 class SocketGetConfigCommand(SocketManagementCommandBase):
-    def execute(self, handle) -> None:
-        message = self._build_command(SocketCommand.GET_CONFIG)
-        handle(message)
+    command = SocketCommand.GET_CONFIG
+    coalesce = True
+
+    def __init__(self, camera=None) -> None:
+        self.camera = camera
 
 
 class SocketSetConfigCommand(SocketManagementCommandBase):
-    def __init__(self, config) -> None:
-        self.config = config
+    command = SocketCommand.SET_CONFIG
+    params = ("config",)
 
-    def execute(self, handle) -> None:
-        message = self._build_command(SocketCommand.SET_CONFIG, {"config": self.config})
-        handle(message)
+    def __init__(self, config, camera=None) -> None:
+        self.config = config
+        self.camera = camera
 
 
 class SocketControlCommand(SocketManagementCommandBase):
-    def __init__(self, control) -> None:
-        self.control = control
+    command = SocketCommand.CONTROL
+    params = ("control",)
 
-    def execute(self, handle) -> None:
-        message = self._build_command(SocketCommand.CONTROL, {"control": self.control})
-        handle(message)
+    def __init__(self, control, camera=None) -> None:
+        self.control = control
+        self.camera = camera
 
 
 class SocketUpgradeCommand(SocketManagementCommandBase):
-    def __init__(self, filePath) -> None:
+    command = SocketCommand.UPGRADE
+    params = ("filePath",)
+
+    def __init__(self, filePath, camera=None) -> None:
         self.filePath = filePath
+        self.camera = camera
+
+
+class SocketPingCommand(SocketManagementCommandBase):
+    command = SocketCommand.PING
+    priority = PRIORITY_LOW
+    coalesce = True
+
+    def __init__(self, camera=None) -> None:
+        self.camera = camera
 
-    def execute(self, handle) -> None:
-        message = self._build_command(
-            SocketCommand.UPGRADE, {"filePath": self.filePath}
-        )
-        handle(message)
 
 class SocketRestartCommand(SocketManagementCommandBase):
-    def execute(self, handle) -> None:
-        message = self._build_command(SocketCommand.RESTART)
-        handle(message)
+    command = SocketCommand.RESTART
+
+    def __init__(self, camera=None) -> None:
+        self.camera = camera
+
+
+SOCKET_COMMANDS = {
+    command_class.command.value: command_class
+    for command_class in (
+        SocketConnectCommand,
+        SocketDisconnectCommand,
+        SocketGetConfigCommand,
+        SocketSetConfigCommand,
+        SocketControlCommand,
+        SocketUpgradeCommand,
+        SocketPingCommand,
+        SocketRestartCommand,
+    )
+}
+
+
+# 对外接口收到的JSON转换为命令对象, 未知命令或缺少参数时抛出ValueError
+def create_socket_command(command_data: dict) -> SocketManagementCommandBase:
+    command = command_data.get("command")
+    command_class = SOCKET_COMMANDS.get(command)
+    if command_class is None:
+        raise ValueError(f"收到未知命令: {command}")
+
+    if any(name not in command_data for name in command_class.params):
+        raise ValueError(f"命令 '{command}' 缺少必需的参数。")
+
+    if command_class is not SocketConnectCommand and not command_data.get("camera"):
+        raise ValueError(f"命令 '{command}' 未指定摄像头。")
+
+    kwargs = {name: command_data[name] for name in command_class.params}
+    return command_class(**kwargs, camera=command_data.get("camera"))
@@ -0,0 +1,46 @@
+import threading
+from typing import Optional
+
+MIN_BUFFER_SIZE = 64 * 1024
+
+
+def _bucket_size(size: int) -> int:
+    bucket = MIN_BUFFER_SIZE
+    while bucket < size:
+        bucket <<= 1
+    return bucket
+
+
+# 按2的幂分桶复用bytearray, 同时限制借出的总字节数
+class BufferPool:
+    def __init__(self, max_total_bytes: int, max_free_per_bucket: int = 4) -> None:
+        self.max_total_bytes = max_total_bytes
+        self.max_free_per_bucket = max_free_per_bucket
+        self.used_bytes = 0
+        self.free = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, size: int) -> Optional[bytearray]:
+        bucket = _bucket_size(size)
+        with self.lock:
+            if self.used_bytes + bucket > self.max_total_bytes:
+                return None
+            self.used_bytes += bucket
+
+            buffers = self.free.get(bucket)
+            if buffers:
+                return buffers.pop()
+
+        return bytearray(bucket)
+
+    def release(self, buffer: bytearray) -> None:
+        bucket = len(buffer)
+        with self.lock:
+            self.used_bytes -= bucket
+            buffers = self.free.setdefault(bucket, [])
+            if len(buffers) < self.max_free_per_bucket:
+                buffers.append(buffer)
+
+    def get_used_bytes(self) -> int:
+        with self.lock:
+            return self.used_bytes
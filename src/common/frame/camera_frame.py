@@ -0,0 +1,10 @@
+import time
+
+
+class CameraFrame:
+    def __init__(self, camera: str, data: bytes, meta=None, sequence: int = 0) -> None:
+        self.camera = camera
+        self.data = data
+        self.meta = meta if meta is not None else {}
+        self.sequence = sequence
+        self.timestamp = time.monotonic()
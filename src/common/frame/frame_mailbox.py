@@ -0,0 +1,70 @@
+import threading
+from collections import deque
+from typing import Optional
+from src.common.frame.camera_frame import CameraFrame
+
+MAX_QUEUED_FRAMES = 64
+
+
+# 每个摄像头一个信箱, 默认只保留最新一帧; lossless时按顺序排队(仍有上限)
+class FrameMailbox:
+    def __init__(self, lossless: bool = False, max_frames: int = MAX_QUEUED_FRAMES) -> None:
+        self.lossless = lossless
+        self.max_frames = max_frames
+        self.slots = {}
+        self.dropped = {}
+        self.cond = threading.Condition()
+
+    def set_lossless(self, lossless: bool) -> None:
+        with self.cond:
+            self.lossless = lossless
+
+    # 返回True表示信箱由空变为非空, 需要通知消费者
+    def put(self, frame: CameraFrame) -> bool:
+        with self.cond:
+            slot = self.slots.get(frame.camera)
+            if slot is None:
+                slot = self.slots[frame.camera] = deque()
+                self.dropped[frame.camera] = 0
+
+            notify = not slot
+            if slot and not self.lossless:
+                self.dropped[frame.camera] += len(slot)
+                slot.clear()
+            elif len(slot) >= self.max_frames:
+                self.dropped[frame.camera] += 1
+                slot.popleft()
+
+            slot.append(frame)
+            self.cond.notify_all()
+            return notify
+
+    def take(self, camera: str) -> Optional[CameraFrame]:
+        with self.cond:
+            slot = self.slots.get(camera)
+            if not slot:
+                return None
+            return slot.popleft()
+
+    def take_any(self, timeout: Optional[float] = None) -> Optional[CameraFrame]:
+        with self.cond:
+            if not self.cond.wait_for(self._has_frame, timeout):
+                return None
+            # 取时间最早的一帧, 保证各摄像头之间的先后顺序
+            slot = min(
+                (slot for slot in self.slots.values() if slot),
+                key=lambda slot: slot[0].timestamp,
+            )
+            return slot.popleft()
+
+    def _has_frame(self) -> bool:
+        return any(self.slots.values())
+
+    def get_dropped(self, camera: str) -> int:
+        with self.cond:
+            return self.dropped.get(camera, 0)
+
+    def remove(self, camera: str) -> None:
+        with self.cond:
+            self.slots.pop(camera, None)
+            self.dropped.pop(camera, None)
@@ -0,0 +1,106 @@
+import os
+import re
+from collections import deque
+from src.common.frame.camera_frame import CameraFrame
+from src.common.frame.frame_sink import BATCH_SIZE, FLUSH_INTERVAL, FrameSinkBase
+
+RECORD_PATH = r"records"
+MAX_RECORD_BYTES = 2 * 1024 * 1024 * 1024
+
+
+# "ip:port"中的冒号在Windows下不能作为目录名
+def get_camera_dir(camera: str) -> str:
+    return re.sub(r"[^0-9A-Za-z_.-]", "_", camera)
+
+
+# 连续录制: 后台线程按批写盘并统一fsync, 超出配额时删除最早的文件
+class FrameRecorder(FrameSinkBase):
+    def __init__(
+        self,
+        root: str = RECORD_PATH,
+        max_bytes: int = MAX_RECORD_BYTES,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+    ) -> None:
+        super().__init__(batch_size, flush_interval)
+        self.root = root
+        self.max_bytes = max_bytes
+
+        self.files = deque()
+        self.usedBytes = 0
+        self.written = 0
+
+    def open(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        self._scan_files()
+
+    def write(self, batch: list) -> None:
+        opened = []
+        dirs = set()
+        try:
+            for frame in batch:
+                path = self._get_frame_path(frame)
+                dirs.add(os.path.dirname(path))
+                f = open(path, "wb")
+                opened.append((f, path))
+                # 文件创建后立即计入配额, 本批后续出错时已写的文件仍会被轮转删除
+                self.files.append((path, len(frame.data)))
+                self.usedBytes += len(frame.data)
+                f.write(frame.data)
+
+            # 整批写完后再统一落盘
+            for f, path in opened:
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            for f, _ in opened:
+                f.close()
+            self._rotate()
+
+        for directory in dirs:
+            self._fsync_dir(directory)
+        self.written += len(batch)
+
+    def _get_frame_path(self, frame: CameraFrame) -> str:
+        directory = os.path.join(self.root, get_camera_dir(frame.camera))
+        os.makedirs(directory, exist_ok=True)
+        # 序号在前便于按顺序浏览, 单调时间戳保证重连后序号重置也不会重名
+        fileName = f"{frame.sequence:08d}_{int(frame.timestamp * 1000000)}.jpg"
+        return os.path.join(directory, fileName)
+
+    def _fsync_dir(self, directory: str) -> None:
+        # Windows不支持打开目录
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # 按写入顺序删除最早的文件, 直到低于配额
+    def _rotate(self) -> None:
+        while self.usedBytes > self.max_bytes and self.files:
+            path, size = self.files.popleft()
+            self.usedBytes -= size
+            try:
+                os.remove(path)
+            except OSError as e:
+                self.logger.error(f"remove record {path} error: {e}")
+
+    # 启动时把已有录制计入配额
+    def _scan_files(self) -> None:
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, path, stat.st_size))
+
+        files.sort()
+        self.files = deque((path, size) for _, path, size in files)
+        self.usedBytes = sum(size for _, _, size in files)
+        self._rotate()
@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+from array import array
+from typing import Optional
+from src.common.frame.camera_frame import CameraFrame
+
+RING_BYTES = 16 * 1024 * 1024
+RING_INITIAL_BYTES = 1024 * 1024
+RING_FRAMES = 4096
+
+
+# 单个摄像头最近帧的环形缓冲: 数据放在bytearray中, 偏移/长度/序号/时间戳放在定长数组中
+# bytearray按需加倍扩大到capacity后才开始回绕, 只短暂接收的摄像头不会占满capacity
+class FrameRing:
+    def __init__(self, capacity: int = RING_BYTES, max_frames: int = RING_FRAMES) -> None:
+        self.capacity = capacity
+        self.max_frames = max_frames
+
+        self.data = bytearray(min(capacity, RING_INITIAL_BYTES))
+        self.offsets = array("q", bytes(8 * max_frames))
+        self.lengths = array("q", bytes(8 * max_frames))
+        self.sequences = array("q", bytes(8 * max_frames))
+        self.timestamps = array("d", bytes(8 * max_frames))
+        self.metas = [None] * max_frames
+
+        self.first = 0
+        self.count = 0
+        self.writePos = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.count
+
+    # 逻辑序号(0为最早一帧)转换为槽位
+    def _slot(self, index: int) -> int:
+        return (self.first + index) % self.max_frames
+
+    def _evict(self) -> None:
+        self.metas[self.first] = None
+        self.first = (self.first + 1) % self.max_frames
+        self.count -= 1
+        if self.count == 0:
+            self.first = 0
+            self.writePos = 0
+
+    # 数据按写入顺序首尾相接; 尾部放不下时回到开头, 并淘汰被覆盖的最早帧
+    def put(self, data, sequence: int, timestamp: float, meta=None) -> bool:
+        length = len(data)
+        if length > self.capacity:
+            return False
+
+        with self.lock:
+            if self.count == self.max_frames:
+                self._evict()
+
+            pos = self.writePos
+            size = len(self.data)
+            # 回绕之前数据都在已分配的部分内, 在尾部扩大不影响已有偏移
+            if pos + length > size and size < self.capacity:
+                size = min(self.capacity, max(size * 2, pos + length))
+                self.data.extend(bytes(size - len(self.data)))
+
+            tailStart = None
+            if pos + length > size:
+                tailStart = pos
+                pos = 0
+
+            while self.count:
+                offset = self.offsets[self.first]
+                end = offset + self.lengths[self.first]
+                inTail = tailStart is not None and offset >= tailStart
+                overlap = offset < pos + length and end > pos
+                if not inTail and not overlap:
+                    break
+                self._evict()
+                if self.count == 0:
+                    pos = 0
+
+            slot = self._slot(self.count)
+            self.data[pos : pos + length] = data
+            self.offsets[slot] = pos
+            self.lengths[slot] = length
+            self.sequences[slot] = sequence
+            self.timestamps[slot] = timestamp
+            self.metas[slot] = meta
+            self.count += 1
+            self.writePos = pos + length
+            return True
+
+    # 第一帧时间戳不小于timestamp的逻辑序号, 时间戳按写入顺序单调递增
+    def _bisect(self, timestamp: float) -> int:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamps[self._slot(middle)] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _copy(self, camera, index: int) -> CameraFrame:
+        slot = self._slot(index)
+        offset = self.offsets[slot]
+        frame = CameraFrame(
+            camera,
+            bytes(self.data[offset : offset + self.lengths[slot]]),
+            self.metas[slot],
+            self.sequences[slot],
+        )
+        frame.timestamp = self.timestamps[slot]
+        return frame
+
+    # 拖动回放: 取时间戳最接近且不晚于timestamp的一帧
+    def get_at(self, camera, timestamp: float) -> Optional[CameraFrame]:
+        with self.lock:
+            index = self._bisect(timestamp)
+            if index < self.count and self.timestamps[self._slot(index)] == timestamp:
+                return self._copy(camera, index)
+            if index == 0:
+                return None
+            return self._copy(camera, index - 1)
+
+    # 导出最近seconds秒内的帧, 按时间顺序返回拷贝
+    def get_recent(self, camera, seconds: float, now=None) -> list:
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            start = self._bisect(now - seconds)
+            return [self._copy(camera, index) for index in range(start, self.count)]
+
+    def get_latest(self, camera) -> Optional[CameraFrame]:
+        with self.lock:
+            if not self.count:
+                return None
+            return self._copy(camera, self.count - 1)
+
+    def get_range(self) -> Optional[tuple]:
+        with self.lock:
+            if not self.count:
+                return None
+            return (
+                self.timestamps[self.first],
+                self.timestamps[self._slot(self.count - 1)],
+            )
+
+
+# 按摄像头分配环形缓冲, capacity为每个摄像头的字节上限, 为0时不缓存
+class FrameRingStore:
+    def __init__(self, capacity: int = RING_BYTES, max_frames: int = RING_FRAMES) -> None:
+        self.capacity = capacity
+        self.max_frames = max_frames
+        self.rings = {}
+        self.lock = threading.Lock()
+
+    # 修改上限时丢弃已缓存的帧, 之后按新的上限重新创建
+    def set_capacity(self, capacity: int) -> None:
+        with self.lock:
+            if capacity == self.capacity:
+                return
+            self.capacity = capacity
+            self.rings.clear()
+
+    def get_ring(self, camera) -> Optional[FrameRing]:
+        with self.lock:
+            return self.rings.get(camera)
+
+    def put(self, camera, data, sequence: int, timestamp: float, meta=None) -> bool:
+        ring = self.get_ring(camera)
+        if ring is None:
+            with self.lock:
+                if self.capacity <= 0:
+                    return False
+                ring = self.rings.get(camera)
+                if ring is None:
+                    ring = self.rings[camera] = FrameRing(self.capacity, self.max_frames)
+        return ring.put(data, sequence, timestamp, meta)
+
+    def get_at(self, camera, timestamp: float) -> Optional[CameraFrame]:
+        ring = self.get_ring(camera)
+        return ring.get_at(camera, timestamp) if ring else None
+
+    def get_recent(self, camera, seconds: float, now=None) -> list:
+        ring = self.get_ring(camera)
+        return ring.get_recent(camera, seconds, now) if ring else []
+
+    def get_latest(self, camera) -> Optional[CameraFrame]:
+        ring = self.get_ring(camera)
+        return ring.get_latest(camera) if ring else None
+
+    def get_range(self, camera) -> Optional[tuple]:
+        ring = self.get_ring(camera)
+        return ring.get_range() if ring else None
+
+    def remove(self, camera) -> None:
+        with self.lock:
+            self.rings.pop(camera, None)
+
+
+def export_frames(frames: list, directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    for frame in frames:
+        path = os.path.join(directory, f"{frame.sequence:08d}.jpg")
+        with open(path, "wb") as f:
+            f.write(frame.data)
@@ -0,0 +1,105 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from src.common.frame.camera_frame import CameraFrame
+from src.common.frame.frame_mailbox import FrameMailbox
+from src.log import log
+
+MAX_QUEUED_FRAMES = 256
+BATCH_SIZE = 32
+FLUSH_INTERVAL = 0.5
+
+
+# 帧输出的基类: 采集线程只把帧放进信箱, 后台线程按批取出处理
+class FrameSinkBase(ABC):
+    def __init__(
+        self,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_frames: int = MAX_QUEUED_FRAMES,
+        lossless: bool = True,
+    ) -> None:
+        self.logger = log.get_logger()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # 处理跟不上时丢弃最早的帧(lossless为False时只保留最新一帧), 不阻塞采集
+        self.mailbox = FrameMailbox(lossless=lossless, max_frames=max_frames)
+        self.running = False
+        self.thread = None
+
+    def set_lossless(self, lossless: bool) -> None:
+        self.mailbox.set_lossless(lossless)
+
+    def is_recording(self) -> bool:
+        return self.running
+
+    def start(self) -> None:
+        if self.running:
+            return
+
+        self.open()
+        self.running = True
+        self.thread = threading.Thread(
+            target=self._run, name=type(self).__name__, daemon=True
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+
+        self.running = False
+        self.thread.join()
+        self.thread = None
+
+    def put(self, frame: CameraFrame) -> None:
+        if self.running and self.accept(frame):
+            self.mailbox.put(frame)
+
+    def get_dropped(self, camera: str) -> int:
+        return self.mailbox.get_dropped(camera)
+
+    # 在采集线程中调用, 返回False的帧不入队
+    def accept(self, frame: CameraFrame) -> bool:
+        return True
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    @abstractmethod
+    def write(self, batch: list) -> None:
+        pass
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch:
+                try:
+                    self.write(batch)
+                except Exception as e:
+                    self.logger.error(f"{type(self).__name__} write error: {e}")
+            elif not self.running:
+                break
+
+        try:
+            self.close()
+        except Exception as e:
+            self.logger.error(f"{type(self).__name__} close error: {e}")
+
+    # 凑满一批或等待超过flush_interval后返回
+    def _take_batch(self) -> list:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            wait = deadline - time.monotonic()
+            if wait <= 0:
+                break
+            frame = self.mailbox.take_any(wait)
+            if frame is None:
+                break
+            batch.append(frame)
+        return batch
@@ -0,0 +1,112 @@
+import os
+from datetime import datetime
+import cv2
+from src.common.frame.camera_frame import CameraFrame
+from src.common.frame.frame_recorder import get_camera_dir
+from src.common.frame.frame_sink import FrameSinkBase
+from src.common.image.image_pipeline import ImagePipeline
+
+VIDEO_PATH = r"videos"
+VIDEO_FPS = 25.0
+VIDEO_FOURCC = "mp4v"
+VIDEO_SUFFIX = ".mp4"
+SEGMENT_SECONDS = 600.0
+
+
+class VideoSegment:
+    def __init__(self, writer, path, size, start) -> None:
+        self.writer = writer
+        self.path = path
+        self.size = size
+        self.start = start
+        self.frames = 0
+
+
+# 视频录制: 每帧到达后立即解码并写入编码器, 不在内存中缓存
+# interval > 0 时为延时摄影, 每个摄像头每interval秒只保留一帧
+class VideoRecorder(FrameSinkBase):
+    def __init__(
+        self,
+        root: str = VIDEO_PATH,
+        fps: float = VIDEO_FPS,
+        interval: float = 0.0,
+        segment_seconds: float = SEGMENT_SECONDS,
+    ) -> None:
+        # 编码本身即增量写入, 不需要凑批
+        super().__init__(batch_size=1)
+        self.root = root
+        self.fps = fps
+        self.interval = interval
+        self.segment_seconds = segment_seconds
+
+        self.pipeline = ImagePipeline()
+        self.segments = {}
+        self.lastAccepted = {}
+
+    def set_interval(self, interval: float) -> None:
+        self.interval = interval
+
+    def accept(self, frame: CameraFrame) -> bool:
+        last = self.lastAccepted.get(frame.camera)
+        if last is not None and frame.timestamp - last < self.interval:
+            return False
+        self.lastAccepted[frame.camera] = frame.timestamp
+        return True
+
+    def open(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        self.lastAccepted.clear()
+
+    def close(self) -> None:
+        for camera in list(self.segments):
+            self._close_segment(camera)
+
+    def write(self, batch: list) -> None:
+        for frame in batch:
+            image = self.pipeline.decode_full(frame.data)
+            if image is None:
+                self.logger.error(f"decode frame {frame.sequence} of {frame.camera} failed.")
+                continue
+
+            height, width = image.shape[:2]
+            segment = self._get_segment(frame, (width, height))
+            segment.writer.write(image)
+            segment.frames += 1
+
+    # 到达分段时长或分辨率变化时切换到新文件
+    def _get_segment(self, frame: CameraFrame, size) -> VideoSegment:
+        segment = self.segments.get(frame.camera)
+        if segment is not None and (
+            segment.size != size
+            or frame.timestamp - segment.start >= self.segment_seconds
+        ):
+            self._close_segment(frame.camera)
+            segment = None
+
+        if segment is None:
+            segment = self._open_segment(frame, size)
+            self.segments[frame.camera] = segment
+        return segment
+
+    def _open_segment(self, frame: CameraFrame, size) -> VideoSegment:
+        directory = os.path.join(self.root, get_camera_dir(frame.camera))
+        os.makedirs(directory, exist_ok=True)
+        currentTime = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(
+            directory, f"{currentTime}_{frame.sequence:08d}{VIDEO_SUFFIX}"
+        )
+
+        writer = cv2.VideoWriter(
+            path, cv2.VideoWriter_fourcc(*VIDEO_FOURCC), self.fps, size
+        )
+        if not writer.isOpened():
+            raise IOError(f"open video writer {path} failed")
+
+        self.logger.info(f"start video segment {path}")
+        return VideoSegment(writer, path, size, frame.timestamp)
+
+    def _close_segment(self, camera) -> None:
+        segment = self.segments.pop(camera, None)
+        if segment is not None:
+            segment.writer.release()
+            self.logger.info(f"video segment {segment.path} {segment.frames} frames")
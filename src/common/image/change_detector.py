@@ -0,0 +1,110 @@
+import threading
+import zlib
+import cv2
+import numpy as np
+from src.common.frame.frame_sink import FrameSinkBase
+
+# 缩略图平均灰度差(0~255)超过该值视为画面变化
+DIFF_THRESHOLD = 2.0
+THUMB_SIZE = (32, 24)
+
+
+class ChangeState:
+    def __init__(self) -> None:
+        self.checksum = None
+        self.thumb = None
+        self.skipped = 0
+
+
+# 采集线程中只比较压缩数据的校验和(is_duplicate), 不同的帧放入本阶段
+# 后台线程中1/8灰度解码为缩略图, 与最近一次判定为变化的帧比较, 缓慢变化会累积到阈值
+# 判定结果通过on_result(frame, changed)发布; lossless为False时每个摄像头只判定最新一帧
+class ChangeDetector(FrameSinkBase):
+    def __init__(
+        self,
+        enabled: bool = False,
+        threshold: float = DIFF_THRESHOLD,
+        thumb_size=THUMB_SIZE,
+        on_result=None,
+        lossless: bool = False,
+    ) -> None:
+        super().__init__(batch_size=1, lossless=lossless)
+        self.enabled = enabled
+        self.threshold = threshold
+        self.thumb_size = thumb_size
+        self.on_result = on_result
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def set_enabled(self, enabled: bool) -> None:
+        with self.lock:
+            self.enabled = enabled
+            self.states.clear()
+
+    def set_threshold(self, threshold: float) -> None:
+        self.threshold = threshold
+
+    def get_skipped(self, camera) -> int:
+        with self.lock:
+            state = self.states.get(camera)
+            return state.skipped if state else 0
+
+    def remove(self, camera) -> None:
+        with self.lock:
+            self.states.pop(camera, None)
+
+    def _get_state(self, camera) -> ChangeState:
+        with self.lock:
+            state = self.states.get(camera)
+            if state is None:
+                state = self.states[camera] = ChangeState()
+            return state
+
+    def _get_thumb(self, data):
+        image = cv2.imdecode(
+            np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8
+        )
+        if image is None:
+            return None
+        return cv2.resize(image, self.thumb_size, interpolation=cv2.INTER_AREA)
+
+    # 在采集线程中调用, 只计算校验和
+    def is_duplicate(self, camera, data) -> bool:
+        if not self.enabled:
+            return False
+
+        state = self._get_state(camera)
+        checksum = zlib.crc32(data)
+        if checksum == state.checksum:
+            with self.lock:
+                state.skipped += 1
+            return True
+        state.checksum = checksum
+        return False
+
+    def write(self, batch: list) -> None:
+        for frame in batch:
+            changed = self.is_changed(frame.camera, frame.data)
+            if self.on_result:
+                self.on_result(frame, changed)
+
+    # 在后台线程中调用, 比较缩略图
+    def is_changed(self, camera, data) -> bool:
+        if not self.enabled:
+            return True
+
+        state = self._get_state(camera)
+        thumb = self._get_thumb(data)
+        # 解码失败时交给后续流程处理
+        if thumb is None or state.thumb is None or self.threshold <= 0:
+            state.thumb = thumb
+            return True
+
+        diff = float(np.mean(cv2.absdiff(thumb, state.thumb)))
+        if diff < self.threshold:
+            with self.lock:
+                state.skipped += 1
+            return False
+
+        state.thumb = thumb
+        return True
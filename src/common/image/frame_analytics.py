@@ -0,0 +1,127 @@
+import math
+import time
+from abc import ABC, abstractmethod
+import cv2
+import numpy as np
+from src.common.frame.camera_frame import CameraFrame
+from src.common.frame.frame_sink import FrameSinkBase
+from src.common.image.image_pipeline import ImagePipeline
+
+ANALYTICS_SIZE = (320, 240)
+PLUGIN_BUDGET = 0.005
+HISTOGRAM_BINS = 32
+CLIP_LOW = 2
+CLIP_HIGH = 253
+
+
+# 分析插件: image为缩小解码后的BGR图像, gray为对应灰度图, 两者只读
+class AnalyticsPluginBase(ABC):
+    name = ""
+
+    def __init__(self, budget: float = PLUGIN_BUDGET) -> None:
+        self.budget = budget
+        # 超出预算的插件按耗时比例隔帧运行, 各摄像头分别计数
+        self.interval = 1
+        self.cost = 0.0
+
+    @abstractmethod
+    def analyze(self, image: np.ndarray, gray: np.ndarray) -> dict:
+        pass
+
+
+class ExposurePlugin(AnalyticsPluginBase):
+    name = "exposure"
+
+    def analyze(self, image, gray) -> dict:
+        mean, std = cv2.meanStdDev(gray)
+        return {"mean": float(mean[0][0]), "std": float(std[0][0])}
+
+
+# 拉普拉斯方差越大越清晰
+class FocusPlugin(AnalyticsPluginBase):
+    name = "focus"
+
+    def analyze(self, image, gray) -> dict:
+        _, std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_32F))
+        return {"laplacian_var": float(std[0][0]) ** 2}
+
+
+class HistogramPlugin(AnalyticsPluginBase):
+    name = "histogram"
+
+    def __init__(self, budget: float = PLUGIN_BUDGET, bins: int = HISTOGRAM_BINS) -> None:
+        super().__init__(budget)
+        self.bins = bins
+
+    def analyze(self, image, gray) -> dict:
+        result = {}
+        for index, channel in enumerate("bgr"):
+            hist = cv2.calcHist([image], [index], None, [self.bins], [0, 256])
+            result[channel] = hist.ravel().astype(np.int64).tolist()
+        return result
+
+
+class ClippingPlugin(AnalyticsPluginBase):
+    name = "clipping"
+
+    def analyze(self, image, gray) -> dict:
+        total = gray.size
+        return {
+            "dark": np.count_nonzero(gray <= CLIP_LOW) / total,
+            "bright": np.count_nonzero(gray >= CLIP_HIGH) / total,
+        }
+
+
+def create_default_plugins() -> list:
+    return [ExposurePlugin(), FocusPlugin(), HistogramPlugin(), ClippingPlugin()]
+
+
+# 分析阶段: 只处理每个摄像头最新的一帧, 结果连同帧序号通过on_result发布
+class FrameAnalytics(FrameSinkBase):
+    def __init__(self, plugins=None, on_result=None, size=ANALYTICS_SIZE) -> None:
+        super().__init__(batch_size=1, lossless=False)
+        self.plugins = list(plugins) if plugins is not None else create_default_plugins()
+        self.on_result = on_result
+        self.size = size
+        self.pipeline = ImagePipeline()
+        self.results = {}
+        # (插件, 摄像头) -> 还需跳过的帧数
+        self.countdowns = {}
+
+    def get_result(self, camera):
+        return self.results.get(camera)
+
+    def write(self, batch: list) -> None:
+        for frame in batch:
+            results = self.analyze(frame)
+            if results is None:
+                continue
+
+            self.results[frame.camera] = (frame.sequence, results)
+            if self.on_result:
+                self.on_result(frame, results)
+
+    def analyze(self, frame: CameraFrame):
+        image = self.pipeline.decode_preview(frame.data, self.size)
+        if image is None:
+            return None
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        results = {}
+        for plugin in self.plugins:
+            key = (plugin, frame.camera)
+            countdown = self.countdowns.get(key, 0)
+            if countdown > 0:
+                self.countdowns[key] = countdown - 1
+                continue
+
+            start = time.perf_counter()
+            try:
+                results[plugin.name] = plugin.analyze(image, gray)
+            except Exception as e:
+                self.logger.error(f"analytics plugin {plugin.name} error: {e}")
+            plugin.cost = time.perf_counter() - start
+
+            plugin.interval = max(1, math.ceil(plugin.cost / plugin.budget))
+            self.countdowns[key] = plugin.interval - 1
+        return results
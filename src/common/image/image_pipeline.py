@@ -0,0 +1,107 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+import cv2
+import numpy as np
+
+# OpenCV解码结果为BGR顺序
+CHANNEL_INDEX = {"b": 0, "g": 1, "r": 2}
+
+# JPEG在DCT域按比例缩小解码
+REDUCED_COLOR_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+# 除DHT(C4), JPG(C8), DAC(CC)外的C0~CF均为SOF
+SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+# 只解析JPEG头部得到(宽, 高), 非JPEG或解析失败返回None
+def get_jpeg_size(data) -> Optional[tuple]:
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            pos += 2
+            continue
+
+        length = (data[pos + 2] << 8) | data[pos + 3]
+        if marker in SOF_MARKERS:
+            if pos + 9 > len(data):
+                return None
+            height = (data[pos + 5] << 8) | data[pos + 6]
+            width = (data[pos + 7] << 8) | data[pos + 8]
+            return width, height
+        pos += 2 + length
+    return None
+
+
+# 选择缩小后按比例缩放到目标区域时仍不需要放大的最大比例
+def get_reduced_scale(image_size, target_size) -> int:
+    width, height = image_size
+    target_width, target_height = target_size
+    for scale in sorted(REDUCED_COLOR_FLAGS, reverse=True):
+        if width / scale >= target_width or height / scale >= target_height:
+            return scale
+    return 1
+
+
+class ImageFilterBase(ABC):
+    # 在原数组上就地修改, 不分配新图像
+    @abstractmethod
+    def apply(self, image: np.ndarray) -> None:
+        pass
+
+
+class ChannelMaskFilter(ImageFilterBase):
+    def __init__(self, keep: str = "b") -> None:
+        self.drop = [index for name, index in CHANNEL_INDEX.items() if name not in keep]
+
+    def apply(self, image: np.ndarray) -> None:
+        for index in self.drop:
+            image[:, :, index] = 0
+
+
+class ImagePipeline:
+    def __init__(self, filters=None) -> None:
+        self.filters = list(filters) if filters else []
+
+    def set_filters(self, filters) -> None:
+        self.filters = list(filters)
+
+    def decode(self, data, flags: int = cv2.IMREAD_COLOR) -> Optional[np.ndarray]:
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+
+    def decode_full(self, data) -> Optional[np.ndarray]:
+        return self.decode(data, cv2.IMREAD_COLOR)
+
+    # 预览只需要显示区域大小的图像, 按目标尺寸选择缩小解码比例
+    def decode_preview(self, data, target_size) -> Optional[np.ndarray]:
+        image_size = get_jpeg_size(data)
+        if image_size is None:
+            return self.decode_full(data)
+
+        scale = get_reduced_scale(image_size, target_size)
+        return self.decode(data, REDUCED_COLOR_FLAGS.get(scale, cv2.IMREAD_COLOR))
+
+    # 只解码一次, 之后所有滤镜都在同一块内存上处理
+    def process(self, data, target_size=None) -> Optional[np.ndarray]:
+        if target_size is None:
+            image = self.decode_full(data)
+        else:
+            image = self.decode_preview(data, target_size)
+        if image is None:
+            return None
+
+        for image_filter in self.filters:
+            image_filter.apply(image)
+        return image
@@ -0,0 +1,117 @@
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+TOP_IMPORTS = 30
+
+
+class ImportRecord:
+    def __init__(self, name, depth) -> None:
+        self.name = name
+        self.depth = depth
+        self.total = 0.0
+        self.children = 0.0
+
+    def get_self_time(self) -> float:
+        return self.total - self.children
+
+
+# 启动耗时统计: 替换__import__记录每个模块首次导入的总耗时和自身耗时, phase记录各阶段耗时
+class StartupProfile:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self.phases = []
+        self.marks = []
+        self.imports = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.originalImport = builtins.__import__
+
+    def enable(self) -> None:
+        if self.enabled:
+            return
+        self.enabled = True
+        builtins.__import__ = self._import
+
+    def disable(self) -> None:
+        if not self.enabled:
+            return
+        self.enabled = False
+        builtins.__import__ = self.originalImport
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # 相对导入和已加载的模块不计时
+        if level or name in sys.modules:
+            return self.originalImport(name, globals, locals, fromlist, level)
+
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+
+        record = ImportRecord(name, len(stack))
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            return self.originalImport(name, globals, locals, fromlist, level)
+        finally:
+            record.total = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1].children += record.total
+            with self.lock:
+                self.imports.append(record)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                with self.lock:
+                    self.phases.append(
+                        (name, start - self.origin, time.perf_counter() - start)
+                    )
+
+    def mark(self, name) -> None:
+        if self.enabled:
+            with self.lock:
+                self.marks.append((name, time.perf_counter() - self.origin))
+
+    def report(self, top: int = TOP_IMPORTS) -> str:
+        with self.lock:
+            phases = list(self.phases)
+            marks = list(self.marks)
+            imports = list(self.imports)
+
+        lines = ["startup profile", "", "phase                                  start(ms)  cost(ms)"]
+        for name, start, cost in phases:
+            lines.append(f"{name:<38} {start * 1000:>9.1f} {cost * 1000:>9.1f}")
+        for name, at in marks:
+            lines.append(f"{name:<38} {at * 1000:>9.1f}")
+
+        rootTotal = sum(record.total for record in imports if record.depth == 0)
+        lines += [
+            "",
+            f"imports: {len(imports)} modules, {rootTotal * 1000:.1f} ms",
+            "module                                 self(ms)  total(ms)",
+        ]
+        for record in sorted(imports, key=ImportRecord.get_self_time, reverse=True)[:top]:
+            lines.append(
+                f"{record.name:<38} {record.get_self_time() * 1000:>8.1f} {record.total * 1000:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path=None) -> None:
+        text = self.report()
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+
+
+startup_profile = StartupProfile()
@@ -0,0 +1,159 @@
+import json
+import selectors
+import socket
+import time
+from src.driver.driver_socket.camera_socket.camera_registry import (
+    DiscoveryRegistry,
+    SocketInfo,
+    load_registry_cache,
+    save_registry_cache,
+)
+from src.log import log
+
+SEARCH_PORT = 11000
+RECV_SIZE = 2048
+MAX_BATCH = 256
+
+# 主动探测: 摄像头收到后立即广播自身信息
+PROBE_PORT = 11001
+PROBE_MESSAGE = b'{"command": "search"}'
+PROBE_RETRY_DELAY = 1.0
+CACHE_SAVE_DELAY = 2.0
+MAX_POLL_TIMEOUT = 1.0
+
+
+# 摄像头广播监听, 不依赖Qt; 图形界面由SearchSocket驱动, 无界面模式调用serve_forever
+class DiscoveryListener:
+    def __init__(self, on_event=None) -> None:
+        self.logger = log.get_logger()
+        self.on_event = on_event
+        self.registry = DiscoveryRegistry(on_event=self.publish_event)
+        self.sock = None
+        self.cacheDirty = False
+
+        self.recvBuffer = bytearray(RECV_SIZE)
+        self.recvView = memoryview(self.recvBuffer)
+
+    def join_broadcast(self) -> None:
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.sock.bind(("0.0.0.0", SEARCH_PORT))
+        self.sock.setblocking(False)
+
+    def close(self) -> None:
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def publish_event(self, event, info: SocketInfo) -> None:
+        self.logger.info(f"{event} socket: {info.get_ip_port()}, {info.uuid}")
+        self.cacheDirty = True
+        if self.on_event:
+            self.on_event(event, info)
+
+    # 缓存中的摄像头立即显示, 未在TTL内重新广播的会自然过期
+    def load_cache(self) -> list:
+        try:
+            infos = load_registry_cache()
+        except Exception as e:
+            self.logger.error(f"Failed to load discovery cache: {e}")
+            return []
+
+        for info in infos:
+            self.registry.update(info)
+        return infos
+
+    def save_cache(self) -> None:
+        self.cacheDirty = False
+        try:
+            save_registry_cache(self.registry.get_sockets())
+        except Exception as e:
+            self.logger.error(f"Failed to save discovery cache: {e}")
+
+    def send_probe(self) -> None:
+        targets = ["255.255.255.255"] + [info.ip for info in self.registry.get_sockets()]
+        for ip in targets:
+            try:
+                self.sock.sendto(PROBE_MESSAGE, (ip, PROBE_PORT))
+            except OSError as e:
+                self.logger.error(f"Failed to send probe to {ip}: {e}")
+
+    # 可读时一次取完所有排队的广播, 单次上限防止长时间占用线程
+    def recv_messages(self) -> None:
+        for _ in range(MAX_BATCH):
+            try:
+                size, _ = self.sock.recvfrom_into(self.recvBuffer)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                self.logger.error(f"An unexpected error occurred: {e}")
+                break
+
+            self.handle_message(self.recvView[:size])
+
+    def handle_message(self, data) -> None:
+        try:
+            info = json.loads(bytes(data).decode())
+            # 忽略自己或其他采集器发出的探测包
+            if "command" in info:
+                return
+            self.registry.update(SocketInfo(info["ip"], info["port"], info["uuid"]))
+
+        except json.JSONDecodeError:
+            self.logger.error("Failed to decode JSON from received data.")
+
+        except Exception as e:
+            self.logger.error(f"An unexpected error occurred: {e}")
+
+    # 删除到期的摄像头, 返回距离下一次到期的秒数
+    def expire(self):
+        self.registry.expire()
+
+        next_expiry = self.registry.next_expiry()
+        if next_expiry is None:
+            return None
+        return max(0.0, next_expiry - time.monotonic())
+
+    # 线程模式: 等待可读或最早的定时任务(过期/补发探测/保存缓存)
+    def serve_forever(self, stop_event) -> None:
+        self.join_broadcast()
+        selector = selectors.DefaultSelector()
+        selector.register(self.sock, selectors.EVENT_READ)
+
+        try:
+            self.load_cache()
+            self.send_probe()
+            probeAt = time.monotonic() + PROBE_RETRY_DELAY
+            saveAt = None
+
+            while not stop_event.is_set():
+                delay = self.expire()
+                now = time.monotonic()
+                if probeAt is not None and now >= probeAt:
+                    self.send_probe()
+                    probeAt = None
+                if self.cacheDirty and saveAt is None:
+                    saveAt = now + CACHE_SAVE_DELAY
+                if saveAt is not None and now >= saveAt:
+                    self.save_cache()
+                    saveAt = None
+
+                timeout = MAX_POLL_TIMEOUT
+                for at in (probeAt, saveAt):
+                    if at is not None:
+                        timeout = min(timeout, at - now)
+                if delay is not None:
+                    timeout = min(timeout, delay)
+
+                if selector.select(max(0.0, timeout)):
+                    self.recv_messages()
+        finally:
+            selector.close()
+            self.save_cache()
+            self.close()
+
+    def find_socket_info(self, uuid: str):
+        return self.registry.get(uuid)
+
+    def get_socket_infos(self) -> list:
+        return self.registry.get_sockets()
@@ -0,0 +1,130 @@
+import heapq
+import json
+import os
+import threading
+import time
+
+SOCKET_TTL = 20.0
+CACHE_PATH = r"discovery.json"
+
+EVENT_ADD = "add"
+EVENT_UPDATE = "update"
+EVENT_REMOVE = "remove"
+
+
+class SocketInfo:
+    def __init__(self, ip, port, uuid) -> None:
+        self.ip = ip
+        self.port = port
+        self.uuid = uuid
+        self.timestamp = time.monotonic()
+        self.last_seen = time.time()
+
+    def get_uuid(self):
+        return self.uuid
+
+    def get_ip_port(self):
+        return f"{self.ip}:{self.port}"
+
+
+# uuid索引 + 过期时间最小堆; 刷新时只压入新堆项, 旧堆项出堆时按时间戳识别后丢弃
+class DiscoveryRegistry:
+    def __init__(self, ttl: float = SOCKET_TTL, on_event=None) -> None:
+        self.ttl = ttl
+        self.on_event = on_event
+        self.sockets = {}
+        self.heap = []
+        self.lock = threading.Lock()
+
+    def update(self, info: SocketInfo, now=None) -> None:
+        now = time.monotonic() if now is None else now
+        info.timestamp = now
+
+        with self.lock:
+            old = self.sockets.get(info.uuid)
+            self.sockets[info.uuid] = info
+            heapq.heappush(self.heap, (now + self.ttl, info.uuid, now))
+            self._compact()
+
+        if old is None:
+            self._publish(EVENT_ADD, info)
+        elif old.get_ip_port() != info.get_ip_port():
+            self._publish(EVENT_UPDATE, info)
+
+    def expire(self, now=None) -> None:
+        now = time.monotonic() if now is None else now
+        removed = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                _, uuid, timestamp = heapq.heappop(self.heap)
+                info = self.sockets.get(uuid)
+                if info is not None and info.timestamp == timestamp:
+                    del self.sockets[uuid]
+                    removed.append(info)
+
+        for info in removed:
+            self._publish(EVENT_REMOVE, info)
+
+    def next_expiry(self):
+        with self.lock:
+            return self.heap[0][0] if self.heap else None
+
+    def get(self, uuid):
+        with self.lock:
+            return self.sockets.get(uuid)
+
+    def get_sockets(self) -> list:
+        with self.lock:
+            sockets = list(self.sockets.values())
+        return sorted(sockets, key=lambda x: x.uuid)
+
+    def __len__(self) -> int:
+        return len(self.sockets)
+
+    # 堆中失效项过多时重建, 保证堆大小与摄像头数量同阶
+    def _compact(self) -> None:
+        if len(self.heap) <= 2 * len(self.sockets) + 64:
+            return
+
+        self.heap = [
+            (info.timestamp + self.ttl, uuid, info.timestamp)
+            for uuid, info in self.sockets.items()
+        ]
+        heapq.heapify(self.heap)
+
+    def _publish(self, event, info: SocketInfo) -> None:
+        if self.on_event:
+            self.on_event(event, info)
+
+
+def load_registry_cache(path: str = CACHE_PATH) -> list:
+    if not os.path.exists(path):
+        return []
+
+    with open(path, "r", encoding="utf-8") as f:
+        cache = json.load(f)
+
+    infos = []
+    for item in cache:
+        info = SocketInfo(item["ip"], item["port"], item["uuid"])
+        info.last_seen = item.get("last_seen", info.last_seen)
+        infos.append(info)
+    return infos
+
+
+def save_registry_cache(infos: list, path: str = CACHE_PATH) -> None:
+    cache = [
+        {
+            "uuid": info.uuid,
+            "ip": info.ip,
+            "port": info.port,
+            "last_seen": info.last_seen,
+        }
+        for info in infos
+    ]
+
+    # 先写临时文件再替换, 避免写到一半时退出导致缓存损坏
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=4)
+    os.replace(tmp_path, path)
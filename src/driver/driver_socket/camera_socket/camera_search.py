@@ -1,31 +1,21 @@
-import socket
-import json
-import time
-from PyQt6.QtCore import Qt, QObject, QTimerEvent, pyqtSlot
+from PyQt6.QtCore import QObject, QSocketNotifier, QTimer, pyqtSlot
+from src.driver.driver_socket.camera_socket.camera_discovery import (
+    CACHE_SAVE_DELAY,
+    PROBE_RETRY_DELAY,
+    DiscoveryListener,
+)
+from src.driver.driver_socket.camera_socket.camera_registry import SocketInfo
 from src.log import log
 
 
-class SocketInfo(QObject):
-    def __init__(self, ip, port, uuid) -> None:
-        self.ip = ip
-        self.port = port
-        self.uuid = uuid
-        self.timestamp = time.time()
-
-    def get_uuid(self):
-        return self.uuid
-
-    def get_ip_port(self):
-        return f"{self.ip}:{self.port}"
-
-
+# 在Qt事件循环中驱动DiscoveryListener
 class SearchSocket(QObject):
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
 
         self.logger = log.get_logger()
-        self.timerList = []
-        self.sockets = []
+        self.listener = DiscoveryListener(on_event=self.publish_event)
+        self.registry = self.listener.registry
 
     def set_callback(
         self,
@@ -33,75 +23,62 @@ class SearchSocket(QObject):
     ) -> None:
         self.notify_socket_search_callback = notify_socket_search
 
-    def join_broadcast(self) -> None:
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-        self.sock.bind(("0.0.0.0", 11000))
-        self.sock.settimeout(0.1)
-
-    def remove_duplicates(self, new_socket_info: SocketInfo) -> None:
-        self.sockets = [
-            sock for sock in self.sockets if sock.uuid != new_socket_info.uuid
-        ]
-
-    def filter_inactive_sockets(self, current_time: float) -> None:
-        self.sockets = [
-            sock for sock in self.sockets if sock.timestamp + 20 >= current_time
-        ]
-
-    def sort_sockets_by_ip(self) -> None:
-        self.sockets.sort(key=lambda x: x.uuid)
+    def publish_event(self, event, info: SocketInfo) -> None:
+        self.notify_socket_search_callback(event, info.uuid, info.get_ip_port())
 
-    def recv_message(self) -> None:
-        try:
-            data = self.sock.recv(1024)
-            info = json.loads(data.decode())
-            new_socket_info = SocketInfo(info["ip"], info["port"], info["uuid"])
+        if not self.cacheTimer.isActive():
+            self.cacheTimer.start(int(CACHE_SAVE_DELAY * 1000))
 
-            self.remove_duplicates(new_socket_info)
-            self.sockets.append(new_socket_info)
-            self.logger.info(
-                f"find socket: {new_socket_info.ip}:{new_socket_info.port}, {new_socket_info.uuid}"
-            )
+    def recv_messages(self) -> None:
+        self.listener.recv_messages()
+        self.expire()
 
-        except socket.timeout:
-            pass
+    # 过期检查只在最早的条目到期时触发
+    def expire(self) -> None:
+        delay = self.listener.expire()
+        if delay is None:
+            self.expireTimer.stop()
+        else:
+            self.expireTimer.start(int(delay * 1000) + 1)
 
-        except json.JSONDecodeError:
-            self.logger.error("Failed to decode JSON from received data.")
+    @pyqtSlot()
+    def run(self):
+        self.listener.join_broadcast()
 
-        except Exception as e:
-            self.logger.error(f"An unexpected error occurred: {e}")
+        self.expireTimer = QTimer(self)
+        self.expireTimer.setSingleShot(True)
+        self.expireTimer.timeout.connect(self.expire)
 
-        current_time = time.time()
-        self.filter_inactive_sockets(current_time)
-        self.sort_sockets_by_ip()
+        self.notifier = QSocketNotifier(
+            self.listener.sock.fileno(), QSocketNotifier.Type.Read, self
+        )
+        self.notifier.activated.connect(self.recv_messages)
 
-        if len(self.sockets) > 0:
-            self.notify_socket_search_callback(self.sockets[0].get_ip_port())
+        self.cacheTimer = QTimer(self)
+        self.cacheTimer.setSingleShot(True)
+        self.cacheTimer.timeout.connect(self.listener.save_cache)
 
-    def timerEvent(self, event: QTimerEvent):
-        for timer, call in self.timerList:
-            if event.timerId() == timer:
-                call()
-
-    @pyqtSlot()
-    def run(self):
-        self.join_broadcast()
-
-        self.find_socket = self.startTimer(200, Qt.TimerType.PreciseTimer)
-        self.timerList.append((self.find_socket, lambda: self.recv_message()))
+        self.listener.load_cache()
+        self.expire()
+        # 启动时探测一次, 防止丢包稍后再探测一次
+        self.listener.send_probe()
+        QTimer.singleShot(int(PROBE_RETRY_DELAY * 1000), self.listener.send_probe)
 
         self.thread().exec()
 
+        # 线程退出(quit)后在本线程中保存缓存并关闭套接字
+        self.stop()
         self.thread().quit()
 
-    def deleteLater(self):
-        for timer, _ in self.timerList:
-            self.killTimer(timer)
-        self.timerList.clear()
+    def stop(self) -> None:
+        self.notifier.setEnabled(False)
+        self.expireTimer.stop()
+        self.cacheTimer.stop()
+        self.listener.save_cache()
+        self.listener.close()
 
     def find_socket_info(self, uuid: str):
-        for socket in self.sockets:
-            if socket.uuid == uuid:
-                return socket
-        return None
+        return self.listener.find_socket_info(uuid)
+
+    def get_socket_infos(self) -> list:
+        return self.listener.get_socket_infos()
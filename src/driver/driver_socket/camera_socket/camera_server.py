@@ -1,158 +1,414 @@
-from http import client
+import selectors
 import socket
-from PyQt6.QtCore import QObject, pyqtSlot
+import threading
+import time
+from src.common.buffer.buffer_pool import BufferPool
+from src.driver.driver_socket.camera_socket.multipart_parser import (
+    MultipartError,
+    MultipartParser,
+    get_boundary,
+)
 from src.log import log
 
-HTTP_OK = b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n"
+HTTP_OK_KEEP_ALIVE = b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\nConnection: keep-alive\r\n\r\n"
+HTTP_OK_CLOSE = b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
 HTTP_NOTOK = b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n"
+HTTP_TOO_LARGE = b"HTTP/1.1 413 Payload Too Large\r\nContent-Length: 0\r\n\r\n"
+HTTP_BUSY = b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n"
 
+SERVER_PORT = 10000
+RECV_SIZE = 32768
+MAX_HEAD_SIZE = 8192
+CLIENT_TIMEOUT = 5.0
+IDLE_TIMEOUT = 15.0
+SELECT_TIMEOUT = 0.2
+# accept出错(如文件描述符耗尽)后暂停接受连接的时间
+ACCEPT_RETRY_DELAY = 1.0
+MAX_UPLOAD_SIZE = 32 * 1024 * 1024
+MAX_BUFFERED_BYTES = 256 * 1024 * 1024
 
-class CameraServer(QObject):
-    def __init__(self) -> None:
-        super().__init__()
 
+def parse_headers(head: str) -> dict:
+    headers = {}
+    for line in head.split("\r\n")[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+class CameraEntry:
+    def __init__(self, ip, key, callback) -> None:
+        self.ip = ip
+        self.key = key
+        self.callback = callback
+
+
+class CameraConnection:
+    def __init__(self, sock, addr, camera: CameraEntry) -> None:
+        self.sock = sock
+        self.addr = addr
+        self.camera = camera
+        self.buffer = bytearray()
+        self.last_active = time.monotonic()
+        self.reset()
+
+    def reset(self) -> None:
+        self.head = ""
+        self.headers = {}
+        self.keep_alive = True
+        self.content_length = 0
+        self.body = None
+        self.received = 0
+        self.parser = None
+
+
+# 不依赖Qt, 图形界面和无界面模式共用, 在独立线程中运行run()
+class CameraServer:
+    def __init__(
+        self,
+        max_upload_size: int = MAX_UPLOAD_SIZE,
+        max_buffered_bytes: int = MAX_BUFFERED_BYTES,
+    ) -> None:
         self.logger = log().get_logger()
+        self.max_upload_size = max_upload_size
+        self.bufferPool = BufferPool(max_buffered_bytes)
         self.ip = ""
-        self.client_socket = None
+        self.notify_socket_picture_callback = None
+
+        # 白名单: ip -> {摄像头key: CameraEntry}
+        self.cameras = {}
+        self.camerasLock = threading.Lock()
+        self.connections = {}
+        self.selector = None
+        self.serverSocket = None
+        self.acceptResumeAt = None
+        self.running = False
 
     def set_callback(self, notify_socket_picture) -> None:
         self.notify_socket_picture_callback = notify_socket_picture
 
-    def set_camera_ip(self, ip):
+    # key为摄像头的"ip:port", 同一IP上的多个摄像头分别添加和移除
+    def add_camera(self, ip, key=None, callback=None) -> None:
+        if callback is None:
+            callback = self.notify_socket_picture_callback
+
+        with self.camerasLock:
+            entries = self.cameras.setdefault(ip, {})
+            entries.pop(key, None)
+            entries[key] = CameraEntry(ip, key, callback)
+
+    # 未指定key时移除该IP上的所有摄像头
+    def remove_camera(self, ip, key=None) -> None:
+        with self.camerasLock:
+            entries = self.cameras.get(ip)
+            if entries is None:
+                return
+            if key is None:
+                entries.clear()
+            else:
+                entries.pop(key, None)
+            if not entries:
+                del self.cameras[ip]
+
+    # 上传连接来自摄像头的临时端口, 只能按IP匹配, 同一IP上有多个摄像头时交给最后添加的
+    def get_camera(self, ip):
+        with self.camerasLock:
+            entries = self.cameras.get(ip)
+            return next(reversed(entries.values())) if entries else None
+
+    def set_camera_ip(self, ip, callback=None):
+        if self.ip:
+            self.remove_camera(self.ip)
         self.ip = ip
 
-        if not self.ip and self.client_socket is not None:
-            try:
-                self.client_socket.close()
-                self.client_socket = None
-            except OSError as e:
-                print(f"Error occurred while closing socket: {e}")
+        if self.ip:
+            self.add_camera(self.ip, callback=callback)
 
     def listen(self):
+        self.selector = selectors.DefaultSelector()
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
             server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             try:
-                server_socket.bind(("0.0.0.0", 10000))
+                server_socket.bind(("0.0.0.0", SERVER_PORT))
                 server_socket.listen()
+                server_socket.setblocking(False)
+                self.selector.register(server_socket, selectors.EVENT_READ, None)
+            except OSError as e:
+                self.logger.error(f"Failed to start server: {e}")
+                self.selector.close()
+                return
 
-                while True:
-                    self.client_socket, addr = server_socket.accept()
-                    self.logger.info(f"Accepted connection from {addr}")
+            self.serverSocket = server_socket
+            try:
+                while self.running:
+                    for key, _ in self.selector.select(SELECT_TIMEOUT):
+                        self.handle_event(key)
 
-                    with self.client_socket:
-                        if addr[0] != self.ip:
-                            self.logger.warn(f"abnormal ip {addr[0]}")
-                            continue
+                    try:
+                        self.sweep_connections()
+                        self.resume_accept()
+                    except Exception as e:
+                        self.logger.error(f"Error in connection sweep: {e}")
+            finally:
+                for connection in list(self.connections.values()):
+                    self.close_connection(connection)
+                self.selector.close()
+                self.serverSocket = None
 
-                        self.client(self.client_socket)
-                    self.client_socket = None
-            except Exception as e:
-                self.logger.error(f"Failed to start server: {e}")
+    # 单个事件出错只影响对应的连接, 不退出接收循环
+    def handle_event(self, key):
+        try:
+            if key.data is None:
+                self.accept(key.fileobj)
+            else:
+                self.client(key.data)
+        except Exception as e:
+            self.logger.error(f"Error handling socket event: {e}")
+            if key.data is not None:
+                self.close_connection(key.data)
 
-    def client(self, sock):
+    def accept(self, server_socket):
         try:
-            sock.settimeout(1.0)
+            sock, addr = server_socket.accept()
+        except (BlockingIOError, InterruptedError, ConnectionAbortedError):
+            return
+        except OSError as e:
+            # 监听套接字会一直可读, 暂停一段时间再接受, 避免空转
+            self.logger.error(f"Failed to accept connection: {e}")
+            self.selector.unregister(server_socket)
+            self.acceptResumeAt = time.monotonic() + ACCEPT_RETRY_DELAY
+            return
 
-            full_data = b""
-            head = ""
-            content_length = 0
+        self.logger.info(f"Accepted connection from {addr}")
 
-            while True:
-                try:
-                    chunk = sock.recv(512)
-                    if len(chunk) == 0:
-                        self.logger.warn(f"recv no data.")
-                        break
-                    full_data += chunk
-                    if b"\r\n\r\n" in full_data:
-                        break
-
-                except socket.timeout:
-                    self.logger.warn("recv timeout.")
-                    break
-                except Exception as e:
-                    self.logger.error(f"Data receive error: {e}")
-                    break
-
-            if len(full_data) == 0:
-                self.logger.error("recv no data.")
-                sock.sendall(HTTP_NOTOK)
-                return
+        camera = self.get_camera(addr[0])
+        if camera is None:
+            self.logger.warning(f"abnormal ip {addr[0]}")
+            sock.close()
+            return
 
-            payload_start = full_data.find(b"\r\n\r\n") + 4
-            if payload_start == -1:
-                self.logger.error(f"recv no head for {len(full_data)} data.")
-                sock.sendall(HTTP_NOTOK)
-                return
+        connection = CameraConnection(sock, addr, camera)
+        try:
+            sock.setblocking(False)
+            self.connections[sock.fileno()] = connection
+            self.selector.register(sock, selectors.EVENT_READ, connection)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Failed to register connection from {addr}: {e}")
+            self.close_connection(connection)
 
-            head = full_data[:payload_start].decode("utf-8")
-            if not head.startswith("POST /camera/image HTTP/1.1\r\n"):
-                self.logger.error(f"recv head error, {full_data[:20]}")
-                sock.sendall(HTTP_NOTOK)
-                return
+    def resume_accept(self):
+        if self.acceptResumeAt is None or time.monotonic() < self.acceptResumeAt:
+            return
+        self.acceptResumeAt = None
+        self.selector.register(self.serverSocket, selectors.EVENT_READ, None)
 
-            content_length_header = "Content-Length: "
-            length_pos = head.find(content_length_header)
-            if length_pos != -1:
-                length_end = head.find("\r\n", length_pos)
-                if length_end != -1:
-                    try:
-                        content_length = int(
-                            head[length_pos + len(content_length_header) : length_end]
-                        )
-                    except ValueError:
-                        self.logger.error("Failed to parse Content-Length.")
-                        sock.sendall(HTTP_NOTOK)
-                        return
-
-            if content_length <= 0:
-                self.logger.error(f"Parse Content-Length error, {content_length}.")
-                sock.sendall(HTTP_NOTOK)
-                return
+    def close_connection(self, connection: CameraConnection):
+        if connection.body is not None:
+            self.bufferPool.release(connection.body)
+            connection.body = None
+
+        self.connections.pop(connection.sock.fileno(), None)
+        try:
+            self.selector.unregister(connection.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            connection.sock.close()
+        except OSError as e:
+            self.logger.error(f"Error occurred while closing socket: {e}")
 
-            remaining_length = content_length - (len(full_data) + -len(head))
-            while remaining_length > 0:
+    def sweep_connections(self):
+        now = time.monotonic()
+        for connection in list(self.connections.values()):
+            idle = now - connection.last_active
+            if self.get_camera(connection.addr[0]) is not connection.camera:
+                self.logger.info(f"camera {connection.addr[0]} removed, close.")
+                self.close_connection(connection)
+            elif connection.body is None and not connection.buffer:
+                if idle > IDLE_TIMEOUT:
+                    self.logger.debug(f"keep-alive timeout from {connection.addr[0]}.")
+                    self.close_connection(connection)
+            elif idle > CLIENT_TIMEOUT:
+                self.logger.warning(f"recv timeout from {connection.addr[0]}.")
+                self.reply(connection, HTTP_NOTOK)
+
+    def reply(self, connection: CameraConnection, response: bytes):
+        self.send_response(connection, response)
+        self.close_connection(connection)
+
+    def send_response(self, connection: CameraConnection, response: bytes) -> bool:
+        try:
+            sent = connection.sock.send(response)
+            if sent < len(response):
+                connection.sock.settimeout(1.0)
                 try:
-                    chunk = sock.recv(min(remaining_length, 32768))
-                    if len(chunk) == 0:
-                        self.logger.warn(
-                            f"waiting for {min(remaining_length, 32768)} data."
-                        )
-                        self.logger.warn(f"recv no data.")
-                        break
-                    full_data += chunk
-                    remaining_length -= len(chunk)
-                except socket.timeout:
-                    self.logger.error(f"recv timeout.")
-                    break
-                except Exception as e:
-                    self.logger.error(f"Data receive error: {e}")
-                    break
-
-            self.logger.info(
-                f"data {len(full_data)}, head: {len(head)}, length: {content_length}."
-            )
+                    connection.sock.sendall(response[sent:])
+                finally:
+                    connection.sock.setblocking(False)
+            return True
+        except OSError as e:
+            self.logger.error(f"Data send error: {e}")
+            return False
 
-            if len(full_data) != len(head) + content_length:
-                self.logger.error(
-                    f"Invalid content length or data size, data {len(full_data)}, head: {len(head)}, length: {content_length}."
-                )
-                sock.sendall(HTTP_NOTOK)
-                return
+    def client(self, connection: CameraConnection):
+        try:
+            if connection.body is None:
+                chunk = connection.sock.recv(RECV_SIZE)
+            else:
+                with memoryview(connection.body) as view, view[
+                    connection.received : connection.content_length
+                ] as target:
+                    received = connection.sock.recv_into(target)
+        except BlockingIOError:
+            return
+        except Exception as e:
+            self.logger.error(f"Data receive error: {e}")
+            self.close_connection(connection)
+            return
 
-            payload = full_data[payload_start:]
-            image_start = payload.find(b"\r\n\r\n") + 4
-            image_end = payload[image_start:-2].rfind(b"\r\n")
+        if connection.body is None:
+            received = len(chunk)
+        if received == 0:
+            if connection.body is not None or connection.buffer:
+                self.logger.warning("recv no data.")
+            self.close_connection(connection)
+            return
 
-            image = payload[image_start : image_start + image_end]
+        connection.last_active = time.monotonic()
 
-            self.notify_socket_picture_callback(image)
+        try:
+            if connection.body is None:
+                connection.buffer += chunk
+            else:
+                connection.received += received
+                self.feed_body(connection)
 
-            sock.sendall(HTTP_OK)
+            # 同一连接上可能连续发送了多个请求
+            while self.process_request(connection):
+                pass
 
+        except MultipartError as e:
+            self.logger.error(f"Invalid multipart body: {e}")
+            self.reply(connection, HTTP_NOTOK)
         except Exception as e:
             self.logger.error(f"Critical error in client handling: {e}")
+            self.close_connection(connection)
+
+    def feed_body(self, connection: CameraConnection):
+        if connection.parser is not None:
+            connection.parser.feed(connection.body, connection.received)
+
+    def process_request(self, connection: CameraConnection) -> bool:
+        if connection.body is None and not self.parse_head(connection):
+            return False
+
+        if connection.received < connection.content_length:
+            return False
+
+        self.logger.info(
+            f"data {len(connection.head) + connection.received}, head: {len(connection.head)}, length: {connection.content_length}."
+        )
+
+        self.deliver(connection)
+
+        keep_alive = connection.keep_alive
+        self.bufferPool.release(connection.body)
+        connection.reset()
+
+        if not keep_alive:
+            self.reply(connection, HTTP_OK_CLOSE)
+            return False
+
+        if not self.send_response(connection, HTTP_OK_KEEP_ALIVE):
+            self.close_connection(connection)
+            return False
+
+        return len(connection.buffer) > 0
+
+    def deliver(self, connection: CameraConnection):
+        parser = connection.parser
+        if parser is None:
+            image_start, image_end, meta = 0, connection.content_length, {}
+        else:
+            if not parser.is_complete():
+                raise MultipartError("body ends before closing boundary")
+            if parser.image is None:
+                raise MultipartError("no image part")
+            image_start, image_end = parser.image.start, parser.image.end
+            meta = parser.fields
+
+        # 回调只能在返回前使用image, 需要保留时自行拷贝
+        with memoryview(connection.body) as view, view[image_start:image_end] as image:
+            connection.camera.callback(image, meta)
+
+    def parse_head(self, connection: CameraConnection) -> bool:
+        payload_start = connection.buffer.find(b"\r\n\r\n")
+        if payload_start == -1:
+            if len(connection.buffer) > MAX_HEAD_SIZE:
+                self.logger.error(f"recv no head for {len(connection.buffer)} data.")
+                self.reply(connection, HTTP_NOTOK)
+            return False
+        payload_start += 4
+
+        head = connection.buffer[:payload_start].decode("utf-8")
+        if not head.startswith("POST /camera/image HTTP/1.1\r\n"):
+            self.logger.error(f"recv head error, {bytes(connection.buffer[:20])}")
+            self.reply(connection, HTTP_NOTOK)
+            return False
+
+        headers = parse_headers(head)
+
+        try:
+            content_length = int(headers.get("content-length", "0"))
+        except ValueError:
+            self.logger.error("Failed to parse Content-Length.")
+            self.reply(connection, HTTP_NOTOK)
+            return False
+
+        if content_length <= 0:
+            self.logger.error(f"Parse Content-Length error, {content_length}.")
+            self.reply(connection, HTTP_NOTOK)
+            return False
+
+        if content_length > self.max_upload_size:
+            self.logger.error(
+                f"Content-Length {content_length} exceeds limit {self.max_upload_size}."
+            )
+            self.reply(connection, HTTP_TOO_LARGE)
+            return False
+
+        body = self.bufferPool.acquire(content_length)
+        if body is None:
+            self.logger.error(
+                f"buffered bytes {self.bufferPool.get_used_bytes()} reach limit, reject {content_length}."
+            )
+            self.reply(connection, HTTP_BUSY)
+            return False
+
+        received = min(len(connection.buffer) - payload_start, content_length)
+        body[:received] = connection.buffer[payload_start : payload_start + received]
+        # 多出的数据属于下一个请求, 留在buffer中
+        del connection.buffer[: payload_start + received]
+
+        connection.head = head
+        connection.headers = headers
+        connection.keep_alive = headers.get("connection", "").lower() != "close"
+        connection.content_length = content_length
+        connection.body = body
+        connection.received = received
+
+        # 原始image/jpeg直接作为图片, 其余按multipart解析
+        content_type = headers.get("content-type", "")
+        if not content_type.lower().startswith("image/"):
+            connection.parser = MultipartParser(get_boundary(content_type))
+            self.feed_body(connection)
+        return True
 
-    @pyqtSlot()
     def run(self):
+        self.running = True
         self.listen()
+
+    # 最多等待一个SELECT_TIMEOUT后退出
+    def stop(self):
+        self.running = False
@@ -1,11 +1,20 @@
+import os
 import socket
+import time
 from src.driver.driver_socket.driver_socket import SocketBase
 from src.driver.driver_socket.camera_socket.camera_socket_command import (
     ping_camera,
     get_camera_config,
     set_camera_config,
     control_camera,
-    upgrade_camera,
+    upgrade_camera_head,
+    restart_camera,
+    query_upgrade_offset,
+    generate_file_md5,
+    FILE_CHUNK_SIZE,
+)
+from src.driver.driver_socket.camera_socket.camera_socket_response import (
+    read_response,
 )
 from src.log import log
 
@@ -14,6 +23,12 @@ ERROR_SOCKET_SEND = "Socket send failed."
 ERROR_SOCKET_RECV = "Socket receive failed."
 ERROR_UNKNOWN = "An unknown error occurred."
 
+ACQUIRE_TIMEOUT = 5.0
+MAX_RETRY = 1
+UPGRADE_TIMEOUT = 30.0
+UPGRADE_RETRY = 3
+PROGRESS_INTERVAL = 0.2
+
 
 class CameraSocket(SocketBase):
     def __init__(self) -> None:
@@ -26,44 +41,45 @@ class CameraSocket(SocketBase):
         return False, ""
 
     def _send_command(self, command):
-        try:
-            if not self.open():
-                return self._handle_error(ERROR_SOCKET_OPEN)
-
-            if not self.send(command):
-                self.close()
-                return self._handle_error(ERROR_SOCKET_SEND)
-
-            response = ""
-            while True:
-                try:
-                    trunk = self.recv(1024)
-                    if len(trunk) == 0:
-                        break
-                    response = response + trunk
-                except socket.timeout:
-                    break
-
-            if response.startswith("HTTP/1.1 200 OK"):
-                length = int(response.split("Content-Length: ")[1].split("\r\n")[0])
-                if length > 0:
-                    start_index = response.find("\r\n\r\n") + 4
-                    payload = response[start_index : start_index + length]
-                    self.close()
-                    return True, payload
-                else:
-                    self.close()
-                    return True, ""
-            else:
-                self.close()
-                return self._handle_error("Unexpected response: " + response[:50])
-
-        except socket.timeout:
-            self.close()
-            return self._handle_error(ERROR_SOCKET_RECV)
-        except Exception as e:
-            self.close()
-            return self._handle_error(ERROR_UNKNOWN + f" Error details: {e}")
+        status, response = self._request(command)
+        if not status:
+            return False, ""
+
+        if response.status == 200:
+            return True, response.get_text()
+        else:
+            return self._handle_error(
+                "Unexpected response: " + response.get_status_line()[:50]
+            )
+
+    def _request(self, command):
+        # 复用的空闲连接可能已被摄像头关闭, 这种情况换一条连接重试
+        for _ in range(MAX_RETRY + 1):
+            try:
+                connection, reused = self.pool.acquire(ACQUIRE_TIMEOUT)
+            except Exception as e:
+                return self._handle_error(ERROR_SOCKET_OPEN + f" Error details: {e}")
+
+            try:
+                connection.sock.sendall(bytes(command, "utf-8"))
+                response = read_response(connection.sock)
+            except socket.timeout:
+                self.pool.release(connection, False)
+                return self._handle_error(ERROR_SOCKET_RECV)
+            except OSError as e:
+                self.pool.release(connection, False)
+                if reused:
+                    self.logger.debug(f"stale connection, reconnect: {e}")
+                    continue
+                return self._handle_error(ERROR_SOCKET_SEND + f" Error details: {e}")
+            except Exception as e:
+                self.pool.release(connection, False)
+                return self._handle_error(ERROR_UNKNOWN + f" Error details: {e}")
+
+            self.pool.release(connection, response.keep_alive())
+            return True, response
+
+        return self._handle_error(ERROR_SOCKET_SEND)
 
     def ping(self):
         status, _ = self._send_command(ping_camera())
@@ -81,10 +97,83 @@ class CameraSocket(SocketBase):
         status, _ = self._send_command(control_camera(command))
         return status
 
-    def upgrade(self, file):
-        status, _ = self._send_command(upgrade_camera(file))
-        return status
+    def upgrade(self, filePath, progress=None):
+        total = os.path.getsize(filePath)
+        if total == 0:
+            return self._handle_error("Upgrade file is empty.")
+
+        md5_sum = generate_file_md5(filePath)
+        offset = 0
+        for attempt in range(UPGRADE_RETRY + 1):
+            if attempt > 0:
+                offset = self._query_upgrade_offset(total, md5_sum)
+                self.logger.warning(f"upgrade connection dropped, resume from {offset}.")
+
+            status = self._send_upgrade(filePath, total, md5_sum, offset, progress)
+            if status is not None:
+                return status
+
+        return self._handle_error(ERROR_SOCKET_SEND)[0]
+
+    # 摄像头不支持断点查询时从头开始发送
+    def _query_upgrade_offset(self, total, md5_sum) -> int:
+        status, response = self._request(query_upgrade_offset(total, md5_sum))
+        if not status:
+            return 0
+
+        unit, _, byte_range = response.headers.get("range", "").partition("=")
+        first, _, last = byte_range.partition("-")
+        if unit.strip() != "bytes" or first != "0" or not last.isdigit():
+            return 0
+        return min(int(last) + 1, total)
+
+    # 返回None表示连接中断, 可以续传
+    def _send_upgrade(self, filePath, total, md5_sum, offset, progress):
+        try:
+            connection, _ = self.pool.acquire(ACQUIRE_TIMEOUT)
+        except Exception as e:
+            self._handle_error(ERROR_SOCKET_OPEN + f" Error details: {e}")
+            return None
+
+        sent = offset
+        try:
+            connection.sock.settimeout(UPGRADE_TIMEOUT)
+            connection.sock.sendall(
+                bytes(upgrade_camera_head(total, md5_sum, offset), "utf-8")
+            )
+
+            start = time.monotonic()
+            reported = start
+            with open(filePath, "rb") as f:
+                while sent < total:
+                    # sendfile由内核直接从文件发送, 不经过用户态缓冲
+                    count = min(FILE_CHUNK_SIZE, total - sent)
+                    connection.sock.sendfile(f, sent, count)
+                    sent += count
+
+                    now = time.monotonic()
+                    if progress and (now - reported >= PROGRESS_INTERVAL or sent == total):
+                        reported = now
+                        progress(sent, total, (sent - offset) / max(now - start, 1e-6))
+
+            response = read_response(connection.sock)
+        except OSError as e:
+            self.pool.release(connection, False)
+            self.logger.error(f"upgrade send error at {sent}/{total}: {e}")
+            return None
+        except Exception as e:
+            self.pool.release(connection, False)
+            return self._handle_error(ERROR_UNKNOWN + f" Error details: {e}")[0]
+
+        # 升级后摄像头通常会重启, 不复用该连接
+        self.pool.release(connection, False)
+
+        if response.status == 200:
+            return True
+        return self._handle_error(
+            "Unexpected response: " + response.get_status_line()[:50]
+        )[0]
 
     def restart(self):
-        status, _ = self._send_command(upgrade_camera())
+        status, _ = self._send_command(restart_camera())
         return status
@@ -1,11 +1,7 @@
 import json
 import hashlib
 
-
-def generate_md5(src):
-    md5_hash = hashlib.md5()
-    md5_hash.update(src)
-    return md5_hash.hexdigest()
+FILE_CHUNK_SIZE = 256 * 1024
 
 
 def build_get_request(url) -> str:
@@ -13,25 +9,39 @@ def build_get_request(url) -> str:
 
 
 def build_post_request_json(url, data) -> str:
+    # 长连接上按字节数分帧, 正文后不能再带多余的换行
     return (
         f"POST {url} HTTP/1.1\r\n"
         "Content-Type: application/json\r\n"
-        f"Content-Length: {len(data)}\r\n"
+        f"Content-Length: {len(data.encode('utf-8'))}\r\n"
         "\r\n"
-        f"{data}\r\n"
+        f"{data}"
     )
 
 
-def build_post_request_stream(url, data) -> str:
-    md5_sum = generate_md5(data)
-    return (
+def generate_file_md5(filePath, chunk_size=FILE_CHUNK_SIZE):
+    md5_hash = hashlib.md5()
+    buffer = bytearray(chunk_size)
+    with open(filePath, "rb") as f, memoryview(buffer) as view:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            md5_hash.update(view[:n])
+    return md5_hash.hexdigest()
+
+
+def build_post_request_stream_head(url, length, md5_sum, offset=0) -> str:
+    # offset>0时为断点续传, 正文为文件[offset, length)部分
+    head = (
         f"POST {url} HTTP/1.1\r\n"
         "Content-Type: application/octet-stream\r\n"
-        f"Content-Length: {len(data)}\r\n"
+        f"Content-Length: {length - offset}\r\n"
         f"Content-MD5: {md5_sum}\r\n"
-        "\r\n"
-        f"{data}"
     )
+    if offset > 0:
+        head += f"Content-Range: bytes {offset}-{length - 1}/{length}\r\n"
+    return head + "\r\n"
 
 
 def ping_camera() -> str:
@@ -50,8 +60,21 @@ def control_camera(command) -> str:
     return build_post_request_json("/camera/control", command)
 
 
-def upgrade_camera(file) -> str:
-    return build_post_request_stream("/camera/upgrade", file)
+def upgrade_camera_head(length, md5_sum, offset=0) -> str:
+    return build_post_request_stream_head("/camera/upgrade", length, md5_sum, offset)
+
 
-def upgrade_camera() -> str:
+def query_upgrade_offset(length, md5_sum) -> str:
+    # 断点查询: 摄像头以Range: bytes=0-N回复已收到的部分
+    return (
+        "POST /camera/upgrade HTTP/1.1\r\n"
+        "Content-Length: 0\r\n"
+        f"Content-MD5: {md5_sum}\r\n"
+        f"Content-Range: bytes */{length}\r\n"
+        "\r\n"
+    )
+
+
+def restart_camera() -> str:
     return build_get_request("/camera/restart")
+
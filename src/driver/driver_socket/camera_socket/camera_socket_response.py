@@ -0,0 +1,85 @@
+import socket
+
+RECV_SIZE = 4096
+MAX_HEAD_SIZE = 8192
+
+
+class CameraResponse:
+    def __init__(self, version: str, status: int, reason: str, headers: dict) -> None:
+        self.version = version
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = b""
+
+    def get_status_line(self) -> str:
+        return f"{self.version} {self.status} {self.reason}"
+
+    def get_text(self) -> str:
+        return self.body.decode("utf-8")
+
+    def keep_alive(self) -> bool:
+        return (
+            self.version == "HTTP/1.1"
+            and self.headers.get("connection", "").lower() != "close"
+            and "content-length" in self.headers
+        )
+
+
+def parse_response_head(head: str) -> CameraResponse:
+    status_line, *lines = head.split("\r\n")
+    version, _, rest = status_line.partition(" ")
+    status, _, reason = rest.partition(" ")
+    if not version.startswith("HTTP/") or not status.isdigit():
+        raise ValueError(f"invalid status line: {status_line[:50]}")
+
+    headers = {}
+    for line in lines:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+
+    return CameraResponse(version, int(status), reason, headers)
+
+
+# 读取状态行和头部后按Content-Length精确读取正文, 不再依赖超时结束
+def read_response(sock: socket.socket) -> CameraResponse:
+    buffer = bytearray()
+    head_end = -1
+    while head_end == -1:
+        chunk = sock.recv(RECV_SIZE)
+        if not chunk:
+            raise ConnectionError("connection closed before response head")
+        buffer += chunk
+        head_end = buffer.find(b"\r\n\r\n")
+        if head_end == -1 and len(buffer) > MAX_HEAD_SIZE:
+            raise ValueError("response head too long")
+
+    response = parse_response_head(buffer[:head_end].decode("latin-1"))
+    body = buffer[head_end + 4 :]
+
+    length = response.headers.get("content-length")
+    if length is None:
+        # 没有Content-Length时读到对端关闭为止
+        while True:
+            chunk = sock.recv(RECV_SIZE)
+            if not chunk:
+                break
+            body += chunk
+    else:
+        length = int(length)
+        if len(body) < length:
+            body.extend(bytes(length - len(body)))
+            with memoryview(body) as view:
+                received = len(buffer) - head_end - 4
+                while received < length:
+                    n = sock.recv_into(view[received:])
+                    if n == 0:
+                        raise ConnectionError(
+                            f"connection closed with {length - received} bytes left"
+                        )
+                    received += n
+        del body[length:]
+
+    response.body = bytes(body)
+    return response
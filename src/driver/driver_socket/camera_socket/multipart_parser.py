@@ -0,0 +1,153 @@
+from typing import Optional
+
+STATE_PREAMBLE = 0
+STATE_HEADERS = 1
+STATE_DATA = 2
+STATE_DELIMITER = 3
+STATE_END = 4
+
+MAX_PART_HEAD_SIZE = 4096
+
+
+class MultipartError(Exception):
+    pass
+
+
+def parse_header_params(value: str):
+    main, *params = value.split(";")
+    result = {}
+    for param in params:
+        key, sep, val = param.partition("=")
+        if sep:
+            result[key.strip().lower()] = val.strip().strip('"')
+    return main.strip().lower(), result
+
+
+def get_boundary(content_type: str) -> Optional[bytes]:
+    mime, params = parse_header_params(content_type)
+    if mime != "multipart/form-data" or "boundary" not in params:
+        return None
+    return params["boundary"].encode("latin-1")
+
+
+class MultipartPart:
+    def __init__(self, headers: dict, start: int) -> None:
+        self.headers = headers
+        self.start = start
+        self.end = start
+
+        _, disposition = parse_header_params(headers.get("content-disposition", ""))
+        self.name = disposition.get("name", "")
+        self.filename = disposition.get("filename")
+        self.content_type = headers.get("content-type", "").lower()
+
+    def is_file(self) -> bool:
+        return self.filename is not None or self.content_type.startswith("image/")
+
+
+# 增量解析multipart/form-data, 只记录各部分在缓冲区中的偏移, 不拷贝数据
+class MultipartParser:
+    def __init__(self, boundary: Optional[bytes] = None) -> None:
+        self.boundary = boundary
+        self.delimiter = b"\r\n--" + boundary if boundary else b""
+        self.state = STATE_PREAMBLE
+        self.pos = 0
+        self.parts = []
+        self.fields = {}
+        self.image = None
+
+    def is_complete(self) -> bool:
+        return self.state == STATE_END
+
+    def feed(self, buffer, end: int) -> None:
+        while self.state != STATE_END:
+            if self.state == STATE_PREAMBLE:
+                if not self._parse_preamble(buffer, end):
+                    return
+            elif self.state == STATE_HEADERS:
+                if not self._parse_part_head(buffer, end):
+                    return
+            elif self.state == STATE_DATA:
+                if not self._parse_data(buffer, end):
+                    return
+            elif self.state == STATE_DELIMITER:
+                if not self._parse_delimiter(buffer, end):
+                    return
+
+    def _parse_preamble(self, buffer, end: int) -> bool:
+        line_end = buffer.find(b"\r\n", self.pos, end)
+        if line_end == -1:
+            if end - self.pos > MAX_PART_HEAD_SIZE:
+                raise MultipartError("boundary line too long")
+            return False
+
+        line = bytes(buffer[self.pos : line_end])
+        if not line.startswith(b"--"):
+            raise MultipartError(f"invalid boundary line {line[:20]}")
+
+        # 未声明boundary时从首行学习
+        if self.boundary is None:
+            self.boundary = line[2:]
+            self.delimiter = b"\r\n--" + self.boundary
+        elif line[2:] != self.boundary:
+            raise MultipartError(f"unexpected boundary {line[:20]}")
+
+        self.pos = line_end + 2
+        self.state = STATE_HEADERS
+        return True
+
+    def _parse_part_head(self, buffer, end: int) -> bool:
+        head_end = buffer.find(b"\r\n\r\n", self.pos, end)
+        if head_end == -1:
+            if end - self.pos > MAX_PART_HEAD_SIZE:
+                raise MultipartError("part head too long")
+            return False
+
+        headers = {}
+        for line in bytes(buffer[self.pos : head_end]).decode("utf-8").split("\r\n"):
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        self.parts.append(MultipartPart(headers, head_end + 4))
+        self.pos = head_end + 4
+        self.state = STATE_DATA
+        return True
+
+    def _parse_data(self, buffer, end: int) -> bool:
+        index = buffer.find(self.delimiter, self.pos, end)
+        if index == -1:
+            # 分隔符可能跨越两次接收, 保留末尾重叠部分下次再查找
+            self.pos = max(self.pos, end - len(self.delimiter) + 1)
+            return False
+
+        part = self.parts[-1]
+        part.end = index
+        self._finish_part(buffer, part)
+
+        self.pos = index + len(self.delimiter)
+        self.state = STATE_DELIMITER
+        return True
+
+    def _parse_delimiter(self, buffer, end: int) -> bool:
+        if end - self.pos < 2:
+            return False
+
+        marker = bytes(buffer[self.pos : self.pos + 2])
+        self.pos += 2
+        if marker == b"--":
+            self.state = STATE_END
+        elif marker == b"\r\n":
+            self.state = STATE_HEADERS
+        else:
+            raise MultipartError(f"invalid data after boundary {marker}")
+        return True
+
+    def _finish_part(self, buffer, part: MultipartPart) -> None:
+        if part.is_file() or part.name == "image":
+            if self.image is None:
+                self.image = part
+        elif part.name:
+            self.fields[part.name] = bytes(buffer[part.start : part.end]).decode(
+                "utf-8", "replace"
+            )
@@ -1,6 +1,7 @@
 import socket
 from typing import Optional
 from src.driver.driver_base import DriverBase
+from src.driver.driver_socket.socket_pool import SocketPool
 
 
 class SocketBase(DriverBase):
@@ -8,10 +9,12 @@ class SocketBase(DriverBase):
         super(SocketBase, self).__init__()
 
         self.sock = None
+        self.pool = None
 
     def config(self, ip, port):
         self.ip = ip
         self.port = port
+        self.pool = SocketPool(ip, port)
         return True
 
     def open(self) -> bool:
@@ -29,6 +32,9 @@ class SocketBase(DriverBase):
         del self.sock
         self.sock = None
 
+        if self.pool:
+            self.pool.close()
+
     def send(self, s) -> bool:
         if not self.sock:
             return False
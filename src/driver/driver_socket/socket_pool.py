@@ -0,0 +1,98 @@
+import select
+import socket
+import threading
+import time
+from src.log import log
+
+MAX_CONNECTIONS = 2
+CONNECT_TIMEOUT = 1.0
+IDLE_TIMEOUT = 30.0
+
+
+class PooledConnection:
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.last_used = time.monotonic()
+        self.requests = 0
+
+
+# 每个摄像头保持若干条长连接, 并限制同时占用的连接数
+class SocketPool:
+    def __init__(
+        self,
+        ip,
+        port,
+        max_connections: int = MAX_CONNECTIONS,
+        timeout: float = CONNECT_TIMEOUT,
+        idle_timeout: float = IDLE_TIMEOUT,
+    ) -> None:
+        self.logger = log.get_logger()
+        self.ip = ip
+        self.port = port
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.idle = []
+        self.lock = threading.Lock()
+        self.semaphore = threading.BoundedSemaphore(max_connections)
+        self.closed = False
+
+    # 返回(连接, 是否复用), 超时仍拿不到连接时抛出TimeoutError
+    def acquire(self, timeout=None):
+        if not self.semaphore.acquire(timeout=timeout):
+            raise TimeoutError(f"no free connection to {self.ip}:{self.port}")
+
+        try:
+            while True:
+                with self.lock:
+                    if self.closed:
+                        raise ConnectionError("socket pool closed")
+                    connection = self.idle.pop() if self.idle else None
+
+                if connection is None:
+                    return self._connect(), False
+                if self._is_healthy(connection):
+                    return connection, True
+                self._close(connection)
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+    def release(self, connection: PooledConnection, reusable: bool = True) -> None:
+        connection.last_used = time.monotonic()
+        connection.requests += 1
+        with self.lock:
+            if reusable and not self.closed:
+                self.idle.append(connection)
+                connection = None
+        if connection is not None:
+            self._close(connection)
+        self.semaphore.release()
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            self._close(connection)
+
+    def _connect(self) -> PooledConnection:
+        sock = socket.create_connection((self.ip, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return PooledConnection(sock)
+
+    def _is_healthy(self, connection: PooledConnection) -> bool:
+        if time.monotonic() - connection.last_used > self.idle_timeout:
+            return False
+
+        # 空闲连接可读说明对端已关闭或发来了多余数据, 都不能再复用
+        try:
+            readable, _, _ = select.select([connection.sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def _close(self, connection: PooledConnection) -> None:
+        try:
+            connection.sock.close()
+        except OSError as e:
+            self.logger.error("socket close fail, %s", e)
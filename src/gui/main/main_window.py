@@ -1,23 +1,29 @@
+from collections import deque
 from datetime import datetime
 import json
 import re
 import os
-import cv2
-import numpy as np
-from PyQt6.QtCore import Qt, pyqtSignal, pyqtSlot, QRegularExpression
+import threading
+from PyQt6.QtCore import QTimer, pyqtSignal, pyqtSlot, QRegularExpression
 from PyQt6.QtWidgets import QMainWindow, QMessageBox, QFileDialog
 from PyQt6.QtGui import (
     QCloseEvent,
     QPixmap,
     QColor,
-    QImage,
     QRegularExpressionValidator,
 )
 from src.log import LogCollector, log
 from src.business.management.driver_management import DriverManagement
+from src.common.startup_profile import startup_profile
 from src.ui.main_window_ui import Ui_MainWindow
 
 
+# 界面日志最多保留的行数, 以及两次刷新之间最多缓存的行数
+MAX_LOG_LINES = 5000
+MAX_PENDING_LOG_LINES = 1000
+LOG_FLUSH_INTERVAL = 200
+
+
 def is_valid_ipv4(ip):
     pattern = re.compile(
         r"^((25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$"
@@ -29,34 +35,46 @@ def is_valid_port(port):
     return 0 <= int(port) <= 65535
 
 
-def get_blue_channel(image_bytes):
-    img = np.frombuffer(image_bytes, dtype=np.uint8)
-    img = cv2.imdecode(img, cv2.IMREAD_COLOR)
-
-    b, _, _ = cv2.split(img)
-    blue_channel_image = cv2.merge([b, np.zeros_like(b), np.zeros_like(b)])
-
-    _, encoded_img = cv2.imencode(".jpg", blue_channel_image)
-
-    return encoded_img.tobytes()
-
-
+# 在日志监听线程中缓存格式化后的行, 缓存由空变非空时才通知界面, 超出上限丢弃最早的行
 class QtLogCollector(LogCollector):
-    def __init__(self, log_signal):
+    def __init__(self, log_signal, max_lines=MAX_PENDING_LOG_LINES):
         super().__init__()
         self.log_signal = log_signal
+        self.lines = deque(maxlen=max_lines)
+        self.dropped = 0
+        self.lock = threading.Lock()
 
     def emit(self, record):
-        self.log_signal.emit(self.format(record))
+        text = self.format(record)
+        with self.lock:
+            notify = not self.lines
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append(text)
+
+        if notify:
+            self.log_signal.emit()
+
+    def take_lines(self):
+        with self.lock:
+            lines = list(self.lines)
+            dropped = self.dropped
+            self.lines.clear()
+            self.dropped = 0
+        return lines, dropped
 
 
 class MainWindow(QMainWindow, Ui_MainWindow):
     display_warning_signal = pyqtSignal(str)
-    display_socket_status_change_signal = pyqtSignal(bool)
-    display_socket_picture_signal = pyqtSignal(bytes)
-    display_socket_config_signal = pyqtSignal(str)
-    display_socket_search_signal = pyqtSignal(str)
-    log_signal = pyqtSignal(str)
+    display_socket_status_change_signal = pyqtSignal(str, bool)
+    display_socket_picture_signal = pyqtSignal(str)
+    display_socket_config_signal = pyqtSignal(str, str)
+    display_socket_search_signal = pyqtSignal(str, str, str)
+    display_socket_upgrade_progress_signal = pyqtSignal(str, "qint64", "qint64", float)
+    display_socket_analytics_signal = pyqtSignal(str, int, object)
+    log_signal = pyqtSignal()
+    # 后台模块创建完成
+    started_signal = pyqtSignal()
 
     def __init__(self, parent=None) -> None:
         super(MainWindow, self).__init__(parent)
@@ -65,23 +83,90 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.lastSerialResult = []
         self.lastSocketResult = []
         self.picBuff = b""
-
-        self.log_signal.connect(self.display_log)
+        self.picCamera = None
+        # 界面操作的摄像头, 自动化接口连接的摄像头不影响界面
+        self.currentCamera = None
+        self.pictureDropped = {}
+        self.searchResult = {}
+        self.driver_management = None
+        self.imagePipeline = None
+        self.renderPool = None
+        self.automationApi = None
+        self.painted = False
+
+        # 日志按固定间隔批量刷新到界面
+        self.logTimer = QTimer(self)
+        self.logTimer.setSingleShot(True)
+        self.logTimer.setInterval(LOG_FLUSH_INTERVAL)
+        self.logTimer.timeout.connect(self.display_log)
+        self.textBrowser_log.document().setMaximumBlockCount(MAX_LOG_LINES)
+
+        self.log_signal.connect(self.schedule_display_log)
         self.log_collector = QtLogCollector(self.log_signal)
         self.logger = log.get_logger()
-        self.logger.addHandler(self.log_collector)
+        log.add_handler(self.log_collector)
         self.init_gui()
 
         self.init_signals()
 
-        self.driver_management = DriverManagement(
-            self,
-            self.display_warning_signal,
-            self.display_socket_status_change_signal,
-            self.display_socket_picture_signal,
-            self.display_socket_config_signal,
-            self.display_socket_search_signal,
-        )
+    # 首次绘制完成后再创建后台模块, 避免窗口出现前界面线程被阻塞
+    def paintEvent(self, event) -> None:
+        super(MainWindow, self).paintEvent(event)
+        if not self.painted:
+            self.painted = True
+            startup_profile.mark("first paint")
+            QTimer.singleShot(0, self.start)
+
+    def start(self) -> None:
+        with startup_profile.phase("driver management"):
+            self.driver_management = DriverManagement(
+                self,
+                self.display_warning_signal,
+                self.display_socket_status_change_signal,
+                self.display_socket_picture_signal,
+                self.display_socket_config_signal,
+                self.display_socket_search_signal,
+                self.display_socket_upgrade_progress_signal,
+                self.display_socket_analytics_signal,
+            )
+
+        self.update_replay_capacity(self.spinBox_replayBuffer.value())
+        self.update_change_detection()
+        self.started_signal.emit()
+
+    # 收到第一帧时才创建图像处理模块, cv2/numpy在此时才导入
+    def start_image_processing(self) -> None:
+        with startup_profile.phase("image pipeline"):
+            from src.common.image.image_pipeline import ImagePipeline
+            from src.gui.render.render_pool import RenderPool
+
+            self.imagePipeline = ImagePipeline()
+            self.update_image_filters(self.checkBox_blue.isChecked())
+
+            # 解码和缩放在线程池中完成, 界面线程只负责绘制
+            self.renderPool = RenderPool(
+                self.imagePipeline,
+                self.driver_management.take_socket_picture,
+                self.get_picture_size,
+                self,
+            )
+            self.renderPool.rendered.connect(self.display_rendered_picture)
+
+        with startup_profile.phase("analytics"):
+            self.driver_management.start_socket_analytics()
+
+    # 本地自动化接口, 默认只监听回环地址
+    def start_api(self, host, port, allowed_hosts=()) -> None:
+        from src.business.api.automation_api import AutomationApi
+
+        try:
+            self.automationApi = AutomationApi(
+                self.driver_management, host, port, allowed_hosts
+            )
+            self.automationApi.start()
+        except OSError as e:
+            self.automationApi = None
+            self.display_warning_signal.emit(f"自动化接口启动失败: {str(e)}")
 
     def init_gui(self) -> None:
         width = self.label_pic.width()
@@ -100,6 +185,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.lineEdit_ipPort.setValidator(regVal)
 
     def closeEvent(self, event: QCloseEvent) -> None:
+        log.remove_handler(self.log_collector)
+        if self.automationApi:
+            self.automationApi.stop()
+        if self.renderPool:
+            self.renderPool.shutdown()
+        if self.driver_management:
+            self.driver_management.shutdown()
         del self.driver_management
 
     def init_signals(self):
@@ -110,12 +202,25 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.display_socket_picture_signal.connect(self.display_socket_picture)
         self.display_socket_config_signal.connect(self.display_socket_config)
         self.display_socket_search_signal.connect(self.display_socket_search)
+        self.checkBox_blue.toggled.connect(self.update_image_filters)
+        self.checkBox_skipStatic.toggled.connect(self.update_change_detection)
+        self.doubleSpinBox_changeThreshold.valueChanged.connect(
+            self.update_change_detection
+        )
+        self.checkBox_skipStaticRecording.toggled.connect(self.update_change_detection)
+        self.spinBox_replayBuffer.valueChanged.connect(self.update_replay_capacity)
+        self.display_socket_upgrade_progress_signal.connect(
+            self.display_socket_upgrade_progress
+        )
+        self.display_socket_analytics_signal.connect(self.display_socket_analytics)
 
     def display_warning(self, warning) -> None:
         self.logger.warning(warning)
         QMessageBox.warning(self, "警告", warning)
 
-    def display_socket_status_change(self, status) -> None:
+    def display_socket_status_change(self, camera, status) -> None:
+        if camera != self.currentCamera:
+            return
         self.checkBox_camera.setChecked(status)
 
         if status:
@@ -153,9 +258,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                     return
 
                 self.label_cameraStatus.setText("摄像头连接中")
+                self.currentCamera = f"{ip}:{int(port)}"
                 self.driver_management.socket_connect(ip, int(port))
             else:
-                self.driver_management.socket_disconnect()
+                self.driver_management.socket_disconnect(self.currentCamera)
 
         elif self.sender() == self.lineEdit_filePath:
             if self.lineEdit_filePath.text():
@@ -173,12 +279,12 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         elif self.sender() == self.pushButton_upgrade:
             filePath = self.lineEdit_filePath.text()
             if filePath and os.path.exists(filePath):
-                self.driver_management.socket_upgrade(filePath)
+                self.driver_management.socket_upgrade(filePath, self.currentCamera)
             else:
                 self.display_warning_signal.emit("固件路径错误")
 
         elif self.sender() == self.pushButton_refreshConfig:
-            self.driver_management.socket_get_config()
+            self.driver_management.socket_get_config(self.currentCamera)
 
         elif self.sender() == self.pushButton_config:
             config = self.textBrowser_config.toPlainText()
@@ -189,7 +295,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.driver_management.socket_set_config(
                 json.dumps(
                     json.loads(config), ensure_ascii=False, separators=(",", ":")
-                )
+                ),
+                self.currentCamera,
             )
 
         elif self.sender() == self.pushButton_copy:
@@ -220,8 +327,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             if not os.path.exists("images"):
                 os.makedirs("images")
 
-            currentTime = datetime.now().strftime("%Y%m%d_%H%M%S")
-            fileName = f"images\\target_{currentTime}.jpg"
+            # 精确到微秒, 同一秒内多次保存不会覆盖
+            currentTime = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            fileName = os.path.join("images", f"target_{currentTime}.jpg")
 
             try:
                 with open(fileName, "wb") as f:
@@ -230,36 +338,147 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             except Exception as e:
                 self.display_warning_signal.emit(f"保存图片失败: {str(e)}")
 
+        elif self.sender() == self.checkBox_record:
+            if self.checkBox_record.isChecked():
+                try:
+                    self.driver_management.start_socket_recording()
+                    self.statusBar().showMessage("开始录制")
+                except Exception as e:
+                    self.checkBox_record.setChecked(False)
+                    self.display_warning_signal.emit(f"开始录制失败: {str(e)}")
+            else:
+                self.driver_management.stop_socket_recording()
+                self.statusBar().showMessage("停止录制")
+
+        elif self.sender() == self.checkBox_video:
+            if self.checkBox_video.isChecked():
+                try:
+                    self.driver_management.start_socket_video(
+                        self.doubleSpinBox_interval.value()
+                    )
+                    self.doubleSpinBox_interval.setEnabled(False)
+                    self.statusBar().showMessage("开始录制视频")
+                except Exception as e:
+                    self.checkBox_video.setChecked(False)
+                    self.display_warning_signal.emit(f"开始录制视频失败: {str(e)}")
+            else:
+                self.driver_management.stop_socket_video()
+                self.doubleSpinBox_interval.setEnabled(True)
+                self.statusBar().showMessage("停止录制视频")
+
+        elif self.sender() == self.pushButton_replay:
+            if self.picCamera is None:
+                self.display_warning_signal.emit("未收到图片")
+                return
+
+            count = self.driver_management.export_socket_replay(
+                self.picCamera, self.spinBox_replay.value()
+            )
+            self.statusBar().showMessage(f"导出回放 {count} 帧")
+
         elif self.sender() == self.pushButton_restart:
             if QMessageBox.StandardButton.Yes == QMessageBox.warning(self, "警告", "请确认需要重启！", QMessageBox.StandardButton.Yes|QMessageBox.StandardButton.No):
-                self.driver_management.socket_restart()
-
-    def display_socket_picture(self, image) -> None:
-        qimage = QImage()
-        if self.checkBox_blue.isChecked():
-            image = get_blue_channel(image)
-        if qimage.loadFromData(image):
-            self.picBuff = image
-            pixmap = QPixmap.fromImage(qimage)
-            scaled_pixmap = pixmap.scaled(
-                640,
-                480,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation,
+                self.driver_management.socket_restart(self.currentCamera)
+
+    def display_socket_picture(self, camera) -> None:
+        if self.renderPool is None:
+            self.start_image_processing()
+        self.renderPool.request(camera)
+
+        dropped = self.driver_management.get_socket_picture_dropped(camera)
+        skipped = self.driver_management.get_socket_picture_skipped(camera)
+        if (dropped, skipped) != self.pictureDropped.get(camera, (0, 0)):
+            self.pictureDropped[camera] = (dropped, skipped)
+            self.statusBar().showMessage(
+                f"{camera} 已丢弃 {dropped} 帧, 跳过静止帧 {skipped} 帧"
+            )
+
+    def update_image_filters(self, blue_only) -> None:
+        if self.imagePipeline is None:
+            return
+
+        from src.common.image.image_pipeline import ChannelMaskFilter
+
+        self.imagePipeline.set_filters([ChannelMaskFilter("b")] if blue_only else [])
+
+    # 三个控件任一变化时按当前值整体更新
+    def update_change_detection(self, *_) -> None:
+        if self.driver_management:
+            self.driver_management.set_socket_change_detection(
+                self.checkBox_skipStatic.isChecked(),
+                self.doubleSpinBox_changeThreshold.value(),
+                self.checkBox_skipStaticRecording.isChecked(),
             )
-            self.label_pic.setPixmap(scaled_pixmap)
+
+    def update_replay_capacity(self, megabytes) -> None:
+        if self.driver_management:
+            self.driver_management.set_socket_replay_capacity(megabytes * 1024 * 1024)
+
+    def get_picture_size(self) -> tuple:
+        size = self.label_pic.size()
+        return size.width(), size.height()
+
+    def display_rendered_picture(self, frame, image) -> None:
+        if image is not None:
+            # 保存时使用原始JPEG数据
+            self.picBuff = frame.data
+            self.picCamera = frame.camera
+            self.label_pic.setPixmap(QPixmap.fromImage(image))
         else:
             print("Failed to convert image data to QPixmap.")
 
-    def display_socket_config(self, config):
+    def display_socket_config(self, camera, config):
+        if camera != self.currentCamera:
+            return
         self.textBrowser_config.setText(json.dumps(json.loads(config), indent=4))
 
-    def display_socket_search(self, result):
+    def display_socket_search(self, event, uuid, ip_port):
+        if event == "remove":
+            self.searchResult.pop(uuid, None)
+        else:
+            self.searchResult[uuid] = ip_port
+
+        # 按uuid排序显示第一个, 其余在提示中列出
+        results = [self.searchResult[key] for key in sorted(self.searchResult)]
+        result = results[0] if results else ""
         self.lineEdit_search.setText(result)
+        self.lineEdit_search.setToolTip("\n".join(results))
         if result:
             self.pushButton_copy.setEnabled(True)
         else:
             self.pushButton_copy.setEnabled(False)
 
-    def display_log(self, log):
-        self.textBrowser_log.append(log)
+    def display_socket_upgrade_progress(self, camera, sent, total, speed):
+        if camera != self.currentCamera:
+            return
+        self.statusBar().showMessage(
+            f"升级中 {sent * 100 // total}% ({sent}/{total}), {speed / 1024:.1f} KB/s"
+        )
+
+    def display_socket_analytics(self, camera, sequence, results):
+        if camera != self.picCamera:
+            return
+
+        lines = [f"{camera} #{sequence}"]
+        if "exposure" in results:
+            lines.append(
+                f"亮度: {results['exposure']['mean']:.1f} ± {results['exposure']['std']:.1f}"
+            )
+        if "focus" in results:
+            lines.append(f"清晰度: {results['focus']['laplacian_var']:.1f}")
+        if "clipping" in results:
+            lines.append(
+                f"过暗: {results['clipping']['dark']:.1%}, 过曝: {results['clipping']['bright']:.1%}"
+            )
+        self.label_pic.setToolTip("\n".join(lines))
+
+    def schedule_display_log(self):
+        if not self.logTimer.isActive():
+            self.logTimer.start()
+
+    def display_log(self):
+        lines, dropped = self.log_collector.take_lines()
+        if dropped:
+            lines.insert(0, f"... 日志过多, 已丢弃 {dropped} 行")
+        if lines:
+            self.textBrowser_log.append("\n".join(lines))
@@ -0,0 +1,97 @@
+import numpy as np
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+from PyQt6.QtGui import QImage
+from src.common.frame.camera_frame import CameraFrame
+from src.common.image.image_pipeline import ImagePipeline
+from src.log import log
+
+MAX_RENDER_THREADS = 4
+
+
+# QImage直接引用数组内存, 调用方需保证数组在QImage使用期间有效
+def to_qimage(image: np.ndarray) -> QImage:
+    height, width = image.shape[:2]
+    return QImage(
+        image.data, width, height, image.strides[0], QImage.Format.Format_BGR888
+    )
+
+
+def render_frame(pipeline: ImagePipeline, data, target_size):
+    array = pipeline.process(data, target_size)
+    if array is None:
+        return None
+
+    width, height = target_size
+    image = to_qimage(array)
+    if image.width() > width or image.height() > height:
+        return image.scaled(
+            width,
+            height,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation,
+        )
+    # 不缩放时拷贝一份, 与numpy数组的内存脱离
+    return image.copy()
+
+
+class RenderSignals(QObject):
+    finished = pyqtSignal(object, object)
+
+
+class RenderTask(QRunnable):
+    def __init__(self, pipeline, frame: CameraFrame, target_size, signals) -> None:
+        super().__init__()
+        self.pipeline = pipeline
+        self.frame = frame
+        self.target_size = target_size
+        self.signals = signals
+
+    def run(self) -> None:
+        try:
+            image = render_frame(self.pipeline, self.frame.data, self.target_size)
+        except Exception as e:
+            log.get_logger().error(f"render frame error: {e}")
+            image = None
+        self.signals.finished.emit(self.frame, image)
+
+
+# 每个摄像头同时只渲染一帧, 完成后再取信箱中最新的一帧, 保证顺序且不渲染过期帧
+class RenderPool(QObject):
+    rendered = pyqtSignal(object, object)
+
+    def __init__(self, pipeline: ImagePipeline, take_frame, get_target_size, parent=None) -> None:
+        super().__init__(parent)
+
+        self.pipeline = pipeline
+        self.take_frame = take_frame
+        self.get_target_size = get_target_size
+        self.busy = set()
+
+        self.threadPool = QThreadPool(self)
+        self.threadPool.setMaxThreadCount(MAX_RENDER_THREADS)
+
+        # 工作线程发出, 排队回到本对象所在的界面线程
+        self.signals = RenderSignals(self)
+        self.signals.finished.connect(self.on_finished)
+
+    def request(self, camera) -> None:
+        if camera in self.busy:
+            return
+
+        frame = self.take_frame(camera)
+        if frame is None:
+            return
+
+        self.busy.add(camera)
+        self.threadPool.start(
+            RenderTask(self.pipeline, frame, self.get_target_size(), self.signals)
+        )
+
+    def on_finished(self, frame: CameraFrame, image) -> None:
+        self.busy.discard(frame.camera)
+        self.rendered.emit(frame, image)
+        self.request(frame.camera)
+
+    def shutdown(self) -> None:
+        self.threadPool.clear()
+        self.threadPool.waitForDone()
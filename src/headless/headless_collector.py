@@ -0,0 +1,181 @@
+import signal
+import threading
+from functools import partial
+from src.common.frame.camera_frame import CameraFrame
+from src.common.frame.frame_recorder import FrameRecorder
+from src.driver.driver_factory import SOCKET_PRODUCT, DriverFactory
+from src.driver.driver_socket.camera_socket.camera_discovery import DiscoveryListener
+from src.driver.driver_socket.camera_socket.camera_registry import (
+    EVENT_ADD,
+    EVENT_UPDATE,
+    SocketInfo,
+)
+from src.driver.driver_socket.camera_socket.camera_server import CameraServer
+from src.log import log
+
+
+def parse_camera(camera: str) -> tuple:
+    ip, port = camera.rsplit(":", 1)
+    return ip, int(port)
+
+
+# 无界面采集: 发现、接收和录制都在普通线程中运行, 不导入Qt
+# numpy/cv2只在启用视频录制或变化检测时才导入
+class HeadlessCollector:
+    def __init__(self, config: dict) -> None:
+        self.logger = log.get_logger()
+        self.config = config
+        self.stopEvent = threading.Event()
+        self.threads = []
+
+        # 摄像头: "ip:port" -> CameraSocket
+        self.cameraSockets = {}
+        self.pictureSequence = {}
+        self.camerasLock = threading.Lock()
+
+        self.server = CameraServer(**config["server"])
+        self.listener = DiscoveryListener(on_event=self.on_discovery)
+        self.changeDetector = self.create_change_detector()
+        self.frameSinks = self.create_frame_sinks()
+
+    def create_change_detector(self):
+        detection = self.config["change_detection"]
+        if not detection["enabled"]:
+            return None
+
+        from src.common.image.change_detector import ChangeDetector
+
+        return ChangeDetector(
+            True, detection["threshold"], on_result=self.on_change, lossless=True
+        )
+
+    def create_frame_sinks(self) -> list:
+        sinks = []
+        record = self.config["record"]
+        if record["enabled"]:
+            sinks.append(FrameRecorder(record["path"], record["max_bytes"]))
+
+        video = self.config["video"]
+        if video["enabled"]:
+            from src.common.frame.video_recorder import VideoRecorder
+
+            sinks.append(
+                VideoRecorder(
+                    video["path"],
+                    video["fps"],
+                    video["interval"],
+                    video["segment_seconds"],
+                )
+            )
+        return sinks
+
+    def start_thread(self, target, name, *args) -> None:
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def start(self) -> None:
+        for sink in self.frameSinks:
+            sink.start()
+        if self.changeDetector:
+            self.changeDetector.start()
+
+        self.start_thread(self.server.run, "camera-server")
+        if self.config["discovery"]:
+            self.start_thread(self.listener.serve_forever, "discovery", self.stopEvent)
+        if self.config["ping_interval"] > 0:
+            self.start_thread(self.ping_forever, "ping")
+
+        for camera in self.config["cameras"]:
+            self.connect(*parse_camera(camera))
+
+    def stop(self) -> None:
+        self.stopEvent.set()
+        self.server.stop()
+        for thread in self.threads:
+            thread.join()
+        self.threads.clear()
+
+        # 变化检测先停止, 排队的帧判定后仍会交给帧输出
+        if self.changeDetector:
+            self.changeDetector.stop()
+        for sink in self.frameSinks:
+            sink.stop()
+
+        with self.camerasLock:
+            cameraSockets = list(self.cameraSockets.values())
+            self.cameraSockets.clear()
+        for cameraSocket in cameraSockets:
+            cameraSocket.close()
+
+    def run_forever(self) -> None:
+        signal.signal(signal.SIGINT, lambda *_: self.stopEvent.set())
+        signal.signal(signal.SIGTERM, lambda *_: self.stopEvent.set())
+
+        self.start()
+        self.logger.info("headless collector started")
+        try:
+            # 带超时等待, 保证Windows下也能及时响应Ctrl+C
+            while not self.stopEvent.wait(1.0):
+                pass
+        finally:
+            self.stop()
+            self.logger.info("headless collector stopped")
+
+    def connect(self, ip, port) -> bool:
+        camera = f"{ip}:{port}"
+        with self.camerasLock:
+            if camera in self.cameraSockets:
+                return True
+
+        cameraSocket = DriverFactory.create(SOCKET_PRODUCT, ip, port)
+        if cameraSocket is None:
+            self.logger.error(f"摄像头{camera}连接失败")
+            return False
+
+        with self.camerasLock:
+            self.cameraSockets[camera] = cameraSocket
+        self.server.add_camera(ip, camera, partial(self.on_picture, camera))
+        self.logger.info(f"摄像头{camera}已添加")
+        return True
+
+    def on_discovery(self, event, info: SocketInfo) -> None:
+        if self.config["auto_connect"] and event in (EVENT_ADD, EVENT_UPDATE):
+            self.connect(info.ip, info.port)
+
+    # 接收线程中只比较校验和, 缩略图比较在变化检测线程中进行
+    def on_picture(self, camera, image, meta=None) -> None:
+        if self.changeDetector and self.changeDetector.is_duplicate(camera, image):
+            return
+
+        sequence = self.pictureSequence.get(camera, 0) + 1
+        self.pictureSequence[camera] = sequence
+
+        # image为接收缓冲区的memoryview, 跨线程前拷贝一次
+        frame = CameraFrame(camera, bytes(image), meta, sequence)
+        if self.changeDetector:
+            self.changeDetector.put(frame)
+        else:
+            self.put_frame(frame)
+
+    def on_change(self, frame, changed) -> None:
+        if changed:
+            self.put_frame(frame)
+
+    def put_frame(self, frame) -> None:
+        for sink in self.frameSinks:
+            sink.put(frame)
+
+    def ping_forever(self) -> None:
+        while not self.stopEvent.wait(self.config["ping_interval"]):
+            with self.camerasLock:
+                cameraSockets = list(self.cameraSockets.items())
+
+            for camera, cameraSocket in cameraSockets:
+                try:
+                    if cameraSocket.ping():
+                        self.logger.debug(f"摄像头{camera}心跳成功")
+                        continue
+                except Exception as e:
+                    self.logger.error(f"发生错误: {e}")
+                self.logger.warning(f"摄像头{camera}心跳失败")
@@ -0,0 +1,53 @@
+import copy
+import json
+import os
+
+CONFIG_PATH = r"headless.json"
+
+DEFAULT_CONFIG = {
+    # 启动时连接的摄像头, "ip:port"
+    "cameras": [],
+    # 自动连接广播发现的摄像头
+    "auto_connect": True,
+    "discovery": True,
+    "ping_interval": 5.0,
+    "server": {
+        "max_upload_size": 32 * 1024 * 1024,
+        "max_buffered_bytes": 256 * 1024 * 1024,
+    },
+    "change_detection": {
+        "enabled": False,
+        "threshold": 2.0,
+    },
+    "record": {
+        "enabled": True,
+        "path": "records",
+        "max_bytes": 2 * 1024 * 1024 * 1024,
+    },
+    "video": {
+        "enabled": False,
+        "path": "videos",
+        "fps": 25.0,
+        "interval": 0.0,
+        "segment_seconds": 600.0,
+    },
+}
+
+
+def merge_config(base: dict, override: dict) -> dict:
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            merge_config(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+# 配置文件只需写与默认值不同的项
+def load_config(path: str = CONFIG_PATH) -> dict:
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if not os.path.exists(path):
+        return config
+
+    with open(path, "r", encoding="utf-8") as f:
+        return merge_config(config, json.load(f))
@@ -1,17 +1,23 @@
 from abc import ABCMeta, abstractmethod
+import atexit
 import logging
+import os
+import queue
+import re
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from src.common.designPattern.singleton import SingletonBase
 
 log_path = r"log.txt"
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 10
+LOG_FORMAT = "%(asctime)s   [%(levelname)s] %(filename)s:%(lineno)s %(message)s"
 
 
 class LogCollector(logging.Handler):
     def __init__(self):
         super().__init__()
 
-        formatter = logging.Formatter(
-            "%(asctime)s   [%(levelname)s] %(filename)s:%(lineno)s %(message)s"
-        )
+        formatter = logging.Formatter(LOG_FORMAT)
         self.setFormatter(formatter)
 
     @abstractmethod
@@ -19,28 +25,94 @@ class LogCollector(logging.Handler):
         pass
 
 
+# 每天零点或超过max_bytes时轮转, 轮转文件名为"文件名.日期.序号", 序号在同一天内递增
+class SizedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+        super().__init__(
+            filename, when="midnight", backupCount=backup_count, encoding="utf-8"
+        )
+        self.max_bytes = max_bytes
+        self.rotatedMatch = re.compile(
+            re.escape(os.path.basename(self.baseFilename))
+            + r"\.(\d{4}-\d{2}-\d{2})(?:\.(\d+))?$"
+        )
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+
+        if self.max_bytes > 0 and self.stream is not None:
+            self.stream.seek(0, 2)
+            if self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes:
+                return True
+        return False
+
+    # 轮转文件按(日期, 序号)排序, 最旧的在前; 不能按文件名排序, 否则".10"会排在".2"之前
+    def get_rotated_files(self) -> list:
+        dirName = os.path.dirname(self.baseFilename)
+        rotated = []
+        for fileName in os.listdir(dirName):
+            match = self.rotatedMatch.match(fileName)
+            if match:
+                key = (match.group(1), int(match.group(2) or 0))
+                rotated.append((key, os.path.join(dirName, fileName)))
+        rotated.sort()
+        return rotated
+
+    def rotation_filename(self, default_name):
+        name = super().rotation_filename(default_name)
+        date = self.rotatedMatch.match(os.path.basename(name)).group(1)
+        index = max(
+            (key[1] for key, _ in self.get_rotated_files() if key[0] == date),
+            default=0,
+        )
+        return f"{name}.{index + 1}"
+
+    def getFilesToDelete(self):
+        rotated = self.get_rotated_files()
+        if len(rotated) <= self.backupCount:
+            return []
+        return [path for _, path in rotated[: len(rotated) - self.backupCount]]
+
+
 # 单例模式
+# 记录只在调用线程中放入队列, 写文件/控制台/界面都在QueueListener线程中进行
 class log(SingletonBase):
     def __init__(self) -> None:
         if not hasattr(self, "logger"):
             l = logging.getLogger()
             l.setLevel(level=logging.DEBUG)
-            filehandle = logging.FileHandler(log_path, encoding="utf-8")
+            filehandle = SizedTimedRotatingFileHandler(log_path)
             streamhandle = logging.StreamHandler()
-            l.addHandler(filehandle)
-            l.addHandler(streamhandle)
-            formatter = logging.Formatter(
-                "%(asctime)s   [%(levelname)s] %(filename)s:%(lineno)s %(message)s"
-            )
+            formatter = logging.Formatter(LOG_FORMAT)
             filehandle.setFormatter(formatter)
             streamhandle.setFormatter(formatter)
 
+            self.queue = queue.SimpleQueue()
+            l.addHandler(QueueHandler(self.queue))
+            self.listener = QueueListener(
+                self.queue, filehandle, streamhandle, respect_handler_level=True
+            )
+            self.listener.start()
+            atexit.register(self.listener.stop)
+
             self.logger = l
 
     @classmethod
     def get_logger(cls) -> logging.Logger:
         return log().logger
 
+    # 附加的输出(如界面日志)同样在监听线程中调用
+    @classmethod
+    def add_handler(cls, handler: logging.Handler) -> None:
+        listener = log().listener
+        listener.handlers = listener.handlers + (handler,)
+
+    @classmethod
+    def remove_handler(cls, handler: logging.Handler) -> None:
+        listener = log().listener
+        listener.handlers = tuple(h for h in listener.handlers if h is not handler)
+
 
 if __name__ == "__main__":
     logger = log.get_logger()
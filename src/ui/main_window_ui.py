@@ -109,6 +109,37 @@ class Ui_MainWindow(object):
         self.pushButton_savePic = QtWidgets.QPushButton(parent=self.groupBox_2)
         self.pushButton_savePic.setObjectName("pushButton_savePic")
         self.verticalLayout.addWidget(self.pushButton_savePic)
+        self.checkBox_record = QtWidgets.QCheckBox(parent=self.groupBox_2)
+        self.checkBox_record.setObjectName("checkBox_record")
+        self.verticalLayout.addWidget(self.checkBox_record)
+        self.horizontalLayout_8 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_8.setObjectName("horizontalLayout_8")
+        self.checkBox_video = QtWidgets.QCheckBox(parent=self.groupBox_2)
+        self.checkBox_video.setObjectName("checkBox_video")
+        self.horizontalLayout_8.addWidget(self.checkBox_video)
+        self.doubleSpinBox_interval = QtWidgets.QDoubleSpinBox(parent=self.groupBox_2)
+        self.doubleSpinBox_interval.setDecimals(1)
+        self.doubleSpinBox_interval.setMaximum(3600.0)
+        self.doubleSpinBox_interval.setObjectName("doubleSpinBox_interval")
+        self.horizontalLayout_8.addWidget(self.doubleSpinBox_interval)
+        self.verticalLayout.addLayout(self.horizontalLayout_8)
+        self.horizontalLayout_9 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_9.setObjectName("horizontalLayout_9")
+        self.spinBox_replayBuffer = QtWidgets.QSpinBox(parent=self.groupBox_2)
+        self.spinBox_replayBuffer.setMaximum(1024)
+        self.spinBox_replayBuffer.setProperty("value", 16)
+        self.spinBox_replayBuffer.setObjectName("spinBox_replayBuffer")
+        self.horizontalLayout_9.addWidget(self.spinBox_replayBuffer)
+        self.spinBox_replay = QtWidgets.QSpinBox(parent=self.groupBox_2)
+        self.spinBox_replay.setMinimum(1)
+        self.spinBox_replay.setMaximum(600)
+        self.spinBox_replay.setProperty("value", 10)
+        self.spinBox_replay.setObjectName("spinBox_replay")
+        self.horizontalLayout_9.addWidget(self.spinBox_replay)
+        self.pushButton_replay = QtWidgets.QPushButton(parent=self.groupBox_2)
+        self.pushButton_replay.setObjectName("pushButton_replay")
+        self.horizontalLayout_9.addWidget(self.pushButton_replay)
+        self.verticalLayout.addLayout(self.horizontalLayout_9)
         self.verticalLayout_2.addWidget(self.groupBox_2)
         self.groupBox = QtWidgets.QGroupBox(parent=self.centralwidget)
         self.groupBox.setObjectName("groupBox")
@@ -117,6 +148,23 @@ class Ui_MainWindow(object):
         self.checkBox_blue = QtWidgets.QCheckBox(parent=self.groupBox)
         self.checkBox_blue.setObjectName("checkBox_blue")
         self.verticalLayout_3.addWidget(self.checkBox_blue)
+        self.horizontalLayout_10 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_10.setObjectName("horizontalLayout_10")
+        self.checkBox_skipStatic = QtWidgets.QCheckBox(parent=self.groupBox)
+        self.checkBox_skipStatic.setObjectName("checkBox_skipStatic")
+        self.horizontalLayout_10.addWidget(self.checkBox_skipStatic)
+        self.doubleSpinBox_changeThreshold = QtWidgets.QDoubleSpinBox(parent=self.groupBox)
+        self.doubleSpinBox_changeThreshold.setDecimals(1)
+        self.doubleSpinBox_changeThreshold.setMinimum(0.1)
+        self.doubleSpinBox_changeThreshold.setMaximum(255.0)
+        self.doubleSpinBox_changeThreshold.setSingleStep(0.5)
+        self.doubleSpinBox_changeThreshold.setProperty("value", 2.0)
+        self.doubleSpinBox_changeThreshold.setObjectName("doubleSpinBox_changeThreshold")
+        self.horizontalLayout_10.addWidget(self.doubleSpinBox_changeThreshold)
+        self.checkBox_skipStaticRecording = QtWidgets.QCheckBox(parent=self.groupBox)
+        self.checkBox_skipStaticRecording.setObjectName("checkBox_skipStaticRecording")
+        self.horizontalLayout_10.addWidget(self.checkBox_skipStaticRecording)
+        self.verticalLayout_3.addLayout(self.horizontalLayout_10)
         self.textBrowser_config = QtWidgets.QTextBrowser(parent=self.groupBox)
         self.textBrowser_config.setReadOnly(False)
         self.textBrowser_config.setObjectName("textBrowser_config")
@@ -155,6 +203,9 @@ class Ui_MainWindow(object):
         self.pushButton_copy.released.connect(MainWindow.update) # type: ignore
         self.pushButton_default.released.connect(MainWindow.update) # type: ignore
         self.pushButton_savePic.released.connect(MainWindow.update) # type: ignore
+        self.checkBox_record.released.connect(MainWindow.update) # type: ignore
+        self.checkBox_video.released.connect(MainWindow.update) # type: ignore
+        self.pushButton_replay.released.connect(MainWindow.update) # type: ignore
         self.pushButton_clearLog.released.connect(self.textBrowser_log.clear) # type: ignore
         self.pushButton_restart.released.connect(MainWindow.update) # type: ignore
         QtCore.QMetaObject.connectSlotsByName(MainWindow)
@@ -175,8 +226,19 @@ class Ui_MainWindow(object):
         self.pushButton_filePath.setText(_translate("MainWindow", "选择文件"))
         self.pushButton_upgrade.setText(_translate("MainWindow", "摄像头升级"))
         self.pushButton_savePic.setText(_translate("MainWindow", "保存图片"))
+        self.checkBox_record.setText(_translate("MainWindow", "连续录制"))
+        self.checkBox_video.setText(_translate("MainWindow", "录制视频"))
+        self.doubleSpinBox_interval.setToolTip(_translate("MainWindow", "延时摄影间隔(秒), 0为不抽帧"))
+        self.doubleSpinBox_interval.setSuffix(_translate("MainWindow", " 秒"))
+        self.spinBox_replayBuffer.setToolTip(_translate("MainWindow", "每个摄像头的回放缓存上限, 0为不缓存"))
+        self.spinBox_replayBuffer.setSuffix(_translate("MainWindow", " MB"))
+        self.spinBox_replay.setSuffix(_translate("MainWindow", " 秒"))
+        self.pushButton_replay.setText(_translate("MainWindow", "导出回放"))
         self.groupBox.setTitle(_translate("MainWindow", "配置"))
         self.checkBox_blue.setText(_translate("MainWindow", "仅显示蓝色通道"))
+        self.checkBox_skipStatic.setText(_translate("MainWindow", "跳过静止帧"))
+        self.doubleSpinBox_changeThreshold.setToolTip(_translate("MainWindow", "缩略图平均灰度差(0~255)超过该值视为画面变化"))
+        self.checkBox_skipStaticRecording.setText(_translate("MainWindow", "不录制静止帧"))
         self.pushButton_default.setText(_translate("MainWindow", "默认"))
         self.pushButton_refreshConfig.setText(_translate("MainWindow", "刷新"))
         self.pushButton_config.setText(_translate("MainWindow", "配置"))
@@ -0,0 +1,12 @@
+import os
+
+import pytest
+
+
+# log.txt、discovery.json等使用相对路径, 测试在临时目录中运行避免写入仓库
+@pytest.fixture(scope="session", autouse=True)
+def run_in_tmp_dir(tmp_path_factory):
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("run"))
+    yield
+    os.chdir(cwd)
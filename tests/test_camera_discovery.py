@@ -0,0 +1,106 @@
+import json
+import socket
+
+import pytest
+
+from src.driver.driver_socket.camera_socket.camera_discovery import DiscoveryListener
+from src.driver.driver_socket.camera_socket.camera_registry import (
+    EVENT_ADD,
+    EVENT_REMOVE,
+    EVENT_UPDATE,
+    DiscoveryRegistry,
+    SocketInfo,
+    load_registry_cache,
+    save_registry_cache,
+)
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def registry(events):
+    return DiscoveryRegistry(
+        ttl=10.0, on_event=lambda event, info: events.append((event, info.uuid))
+    )
+
+
+def test_add_update_and_refresh_events(registry, events):
+    registry.update(SocketInfo("10.0.0.1", 80, "a"), now=0.0)
+    # 地址不变的刷新不发布事件
+    registry.update(SocketInfo("10.0.0.1", 80, "a"), now=1.0)
+    registry.update(SocketInfo("10.0.0.2", 80, "a"), now=2.0)
+
+    assert events == [(EVENT_ADD, "a"), (EVENT_UPDATE, "a")]
+    assert registry.get("a").ip == "10.0.0.2"
+    assert len(registry) == 1
+
+
+def test_refresh_extends_expiry(registry, events):
+    registry.update(SocketInfo("10.0.0.1", 80, "a"), now=0.0)
+    registry.update(SocketInfo("10.0.0.2", 80, "b"), now=0.0)
+    registry.update(SocketInfo("10.0.0.1", 80, "a"), now=8.0)
+
+    # 旧堆项到期时按时间戳识别为失效, 不删除已刷新的摄像头
+    registry.expire(now=10.0)
+    assert [info.uuid for info in registry.get_sockets()] == ["a"]
+    assert events[-1] == (EVENT_REMOVE, "b")
+    assert registry.next_expiry() == 18.0
+
+    registry.expire(now=18.0)
+    assert registry.get_sockets() == []
+    assert events[-1] == (EVENT_REMOVE, "a")
+    assert registry.next_expiry() is None
+
+
+def test_heap_is_compacted(registry):
+    for i in range(1000):
+        registry.update(SocketInfo("10.0.0.1", 80, "a"), now=float(i))
+
+    assert len(registry.heap) <= 2 * len(registry) + 64
+    registry.expire(now=1008.0)
+    assert registry.get("a") is not None
+    registry.expire(now=1009.0)
+    assert registry.get("a") is None
+
+
+def test_cache_round_trip(tmp_path):
+    path = str(tmp_path / "discovery.json")
+    info = SocketInfo("10.0.0.1", 8080, "a")
+    info.last_seen = 123.0
+    save_registry_cache([info], path)
+
+    loaded = load_registry_cache(path)
+    assert [(i.uuid, i.ip, i.port, i.last_seen) for i in loaded] == [
+        ("a", "10.0.0.1", 8080, 123.0)
+    ]
+    assert not (tmp_path / "discovery.json.tmp").exists()
+    assert load_registry_cache(str(tmp_path / "missing.json")) == []
+
+
+def test_listener_drains_datagrams(events):
+    listener = DiscoveryListener(on_event=lambda event, info: events.append((event, info.uuid)))
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.setblocking(False)
+    listener.sock = receiver
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        address = receiver.getsockname()
+        for uuid in ("a", "b", "c"):
+            message = {"ip": "10.0.0.1", "port": 80, "uuid": uuid}
+            sender.sendto(json.dumps(message).encode(), address)
+        # 自己发出的探测包和非法数据被忽略
+        sender.sendto(b'{"command": "search"}', address)
+        sender.sendto(b"not json", address)
+
+        listener.recv_messages()
+    finally:
+        sender.close()
+        listener.close()
+
+    assert [info.uuid for info in listener.get_socket_infos()] == ["a", "b", "c"]
+    assert events == [(EVENT_ADD, "a"), (EVENT_ADD, "b"), (EVENT_ADD, "c")]
+    assert listener.cacheDirty
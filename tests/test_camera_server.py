@@ -0,0 +1,58 @@
+from src.driver.driver_socket.camera_socket.camera_server import CameraServer
+
+IP = "192.168.1.10"
+
+
+def callback(image, meta):
+    pass
+
+
+def test_cameras_on_same_ip_are_kept_apart():
+    server = CameraServer()
+    server.add_camera(IP, f"{IP}:8080", callback)
+    server.add_camera(IP, f"{IP}:8081", callback)
+
+    # 上传按IP匹配到最后添加的摄像头
+    assert server.get_camera(IP).key == f"{IP}:8081"
+
+    server.remove_camera(IP, f"{IP}:8081")
+    assert server.get_camera(IP).key == f"{IP}:8080"
+
+    # 移除已不存在的摄像头不影响其他摄像头
+    server.remove_camera(IP, f"{IP}:8081")
+    assert server.get_camera(IP).key == f"{IP}:8080"
+
+    server.remove_camera(IP, f"{IP}:8080")
+    assert server.get_camera(IP) is None
+    assert server.cameras == {}
+
+
+def test_readded_camera_receives_uploads():
+    server = CameraServer()
+    server.add_camera(IP, f"{IP}:8080", callback)
+    server.add_camera(IP, f"{IP}:8081", callback)
+    server.add_camera(IP, f"{IP}:8080", callback)
+
+    assert server.get_camera(IP).key == f"{IP}:8080"
+
+
+def test_remove_all_cameras_on_ip():
+    server = CameraServer()
+    server.add_camera(IP, f"{IP}:8080", callback)
+    server.add_camera(IP, f"{IP}:8081", callback)
+    server.add_camera("192.168.1.11", "192.168.1.11:8080", callback)
+
+    server.remove_camera(IP)
+    assert server.get_camera(IP) is None
+    assert server.get_camera("192.168.1.11") is not None
+
+
+def test_set_camera_ip_uses_default_callback():
+    server = CameraServer()
+    server.set_callback(callback)
+    server.set_camera_ip(IP)
+    assert server.get_camera(IP).callback is callback
+
+    server.set_camera_ip("192.168.1.11")
+    assert server.get_camera(IP) is None
+    assert server.get_camera("192.168.1.11") is not None
@@ -0,0 +1,106 @@
+import os
+import socket
+import threading
+
+import pytest
+
+from src.driver.driver_socket.camera_socket.camera_socket_response import (
+    parse_response_head,
+    read_response,
+)
+
+
+# 按chunks分次发送, 模拟响应跨越多次接收
+def send_chunks(sock, chunks, close=False):
+    def run():
+        for chunk in chunks:
+            sock.sendall(chunk)
+        if close:
+            sock.shutdown(socket.SHUT_WR)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+@pytest.fixture
+def pair():
+    left, right = socket.socketpair()
+    left.settimeout(5)
+    yield left, right
+    left.close()
+    right.close()
+
+
+def test_parse_response_head():
+    response = parse_response_head(
+        "HTTP/1.1 206 Partial Content\r\nContent-Length: 3\r\nRange: bytes=0-99"
+    )
+    assert response.status == 206
+    assert response.reason == "Partial Content"
+    assert response.headers == {"content-length": "3", "range": "bytes=0-99"}
+    assert response.keep_alive()
+
+
+def test_parse_invalid_status_line():
+    with pytest.raises(ValueError):
+        parse_response_head("garbage\r\n")
+
+
+def test_read_by_content_length(pair):
+    left, right = pair
+    body = b'{"a":1}'
+    # 头部和正文跨越多次接收, 正文之后多余的数据不属于本响应
+    send_chunks(
+        right,
+        [b"HTTP/1.1 200 OK\r\nContent-Len", b"gth: 7\r\n\r\n" + body[:3], body[3:] + b"\r\n"],
+    ).join()
+
+    response = read_response(left)
+    assert response.status == 200
+    assert response.get_text() == '{"a":1}'
+    assert response.keep_alive()
+
+
+def test_read_large_body(pair):
+    left, right = pair
+    body = os.urandom(100000)
+    sender = send_chunks(right, [b"HTTP/1.1 200 OK\r\nContent-Length: 100000\r\n\r\n", body])
+
+    response = read_response(left)
+    sender.join()
+    assert response.body == body
+
+
+def test_read_until_close_without_content_length(pair):
+    left, right = pair
+    send_chunks(right, [b"HTTP/1.0 200 OK\r\n\r\nhello ", b"world"], close=True).join()
+
+    response = read_response(left)
+    assert response.body == b"hello world"
+    assert not response.keep_alive()
+
+
+def test_connection_closed_in_body(pair):
+    left, right = pair
+    send_chunks(right, [b"HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\nabc"], close=True).join()
+
+    with pytest.raises(ConnectionError):
+        read_response(left)
+
+
+def test_connection_closed_before_head(pair):
+    left, right = pair
+    send_chunks(right, [b"HTTP/1.1 200"], close=True).join()
+
+    with pytest.raises(ConnectionError):
+        read_response(left)
+
+
+def test_connection_close_header(pair):
+    left, right = pair
+    send_chunks(
+        right, [b"HTTP/1.1 200 OK\r\nConnection: close\r\nContent-Length: 0\r\n\r\n"]
+    ).join()
+
+    assert not read_response(left).keep_alive()
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import socket
+import threading
+
+import pytest
+
+from src.driver.driver_socket.camera_socket.camera_socket import CameraSocket
+from src.driver.driver_socket.camera_socket.camera_socket_command import (
+    generate_file_md5,
+    upgrade_camera_head,
+)
+
+HTTP_OK = b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n"
+
+
+def read_head(f):
+    lines = []
+    while True:
+        line = f.readline()
+        if not line:
+            return None
+        if line == b"\r\n":
+            return lines
+        lines.append(line.decode("latin-1").rstrip("\r\n"))
+
+
+# 模拟摄像头的升级接口: 第一次上传收到drop_after字节后断开, 支持断点查询和续传
+class FakeCamera:
+    def __init__(self, drop_after=None, support_resume=True) -> None:
+        self.drop_after = drop_after
+        self.support_resume = support_resume
+        self.received = bytearray()
+        self.requests = []
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.port = self.server.getsockname()[1]
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        self.server.close()
+
+    def serve(self) -> None:
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                return
+            with sock, sock.makefile("rb") as f:
+                self.handle(sock, f)
+
+    def handle(self, sock, f) -> None:
+        while True:
+            lines = read_head(f)
+            if lines is None:
+                return
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            self.requests.append((lines[0], headers))
+            length = int(headers.get("content-length", "0"))
+            content_range = headers.get("content-range", "")
+
+            if content_range.startswith("bytes */"):
+                if not self.support_resume or not self.received:
+                    sock.sendall(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                    continue
+                sock.sendall(
+                    b"HTTP/1.1 308 Resume Incomplete\r\nContent-Length: 0\r\n"
+                    b"Range: bytes=0-%d\r\n\r\n" % (len(self.received) - 1)
+                )
+                continue
+
+            offset = 0
+            if content_range:
+                offset = int(content_range.split()[1].split("-")[0])
+            del self.received[offset:]
+
+            if self.drop_after is not None:
+                self.received += f.read(self.drop_after)
+                self.drop_after = None
+                return
+
+            self.received += f.read(length)
+            sock.sendall(HTTP_OK)
+
+
+@pytest.fixture
+def firmware(tmp_path):
+    path = tmp_path / "firmware.bin"
+    path.write_bytes(os.urandom(1024 * 1024 + 123))
+    return str(path)
+
+
+def create_camera_socket(port) -> CameraSocket:
+    cameraSocket = CameraSocket()
+    cameraSocket.config("127.0.0.1", port)
+    return cameraSocket
+
+
+def test_upgrade_head():
+    head = upgrade_camera_head(1000, "abc")
+    assert "Content-Length: 1000\r\n" in head
+    assert "Content-Range" not in head
+
+    head = upgrade_camera_head(1000, "abc", 400)
+    assert "Content-Length: 600\r\n" in head
+    assert "Content-Range: bytes 400-999/1000\r\n" in head
+    assert head.endswith("\r\n\r\n")
+
+
+def test_generate_file_md5(firmware):
+    with open(firmware, "rb") as f:
+        assert generate_file_md5(firmware, chunk_size=4096) == hashlib.md5(f.read()).hexdigest()
+
+
+def test_upgrade_streams_file(firmware):
+    camera = FakeCamera()
+    cameraSocket = create_camera_socket(camera.port)
+    progress = []
+    try:
+        assert cameraSocket.upgrade(firmware, lambda sent, total, speed: progress.append(sent))
+    finally:
+        cameraSocket.close()
+        camera.close()
+
+    with open(firmware, "rb") as f:
+        assert bytes(camera.received) == f.read()
+    assert progress[-1] == os.path.getsize(firmware)
+
+
+def test_upgrade_resumes_after_drop(firmware):
+    camera = FakeCamera(drop_after=300000)
+    cameraSocket = create_camera_socket(camera.port)
+    try:
+        assert cameraSocket.upgrade(firmware)
+    finally:
+        cameraSocket.close()
+        camera.close()
+
+    with open(firmware, "rb") as f:
+        assert bytes(camera.received) == f.read()
+    # 续传从摄像头已收到的位置开始
+    ranges = [headers.get("content-range") for _, headers in camera.requests]
+    assert f"bytes */{os.path.getsize(firmware)}" in ranges
+    assert ranges[-1].startswith("bytes 300000-")
+
+
+def test_upgrade_restarts_without_resume_support(firmware):
+    camera = FakeCamera(drop_after=300000, support_resume=False)
+    cameraSocket = create_camera_socket(camera.port)
+    try:
+        assert cameraSocket.upgrade(firmware)
+    finally:
+        cameraSocket.close()
+        camera.close()
+
+    with open(firmware, "rb") as f:
+        assert bytes(camera.received) == f.read()
+    assert "content-range" not in camera.requests[-1][1]
@@ -0,0 +1,165 @@
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from src.business.management.command_executor import (
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    PRIORITY_URGENT,
+    CommandExecutor,
+)
+
+CAMERA = "192.168.1.10:8080"
+
+
+@pytest.fixture
+def executor():
+    executor = CommandExecutor(max_workers=4)
+    yield executor
+    executor.shutdown()
+
+
+# 在摄像头通道上占住一个独占命令, 后续命令只能排队
+def block_lane(executor, camera=CAMERA):
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    future = executor.submit(camera, blocker)
+    assert started.wait(5)
+    return release, future
+
+
+def test_coalesce_pending_read(executor):
+    release, _ = block_lane(executor)
+    a = executor.submit(CAMERA, lambda: "config", exclusive=False, coalesce_key="get")
+    b = executor.submit(CAMERA, lambda: "config", exclusive=False, coalesce_key="get")
+    assert a is b
+    release.set()
+    assert a.result(5) == "config"
+
+
+def test_read_after_write_is_not_coalesced(executor):
+    config = {"value": "old"}
+
+    def get_config():
+        return config["value"]
+
+    def set_config(value):
+        config["value"] = value
+        return True
+
+    release, _ = block_lane(executor)
+    a = executor.submit(CAMERA, get_config, exclusive=False, coalesce_key="get")
+    executor.submit(CAMERA, set_config, "new")
+    b = executor.submit(CAMERA, get_config, exclusive=False, coalesce_key="get")
+    # 写之后再提交的读可以和其后的读合并
+    c = executor.submit(CAMERA, get_config, exclusive=False, coalesce_key="get")
+    release.set()
+
+    assert a is not b
+    assert b is c
+    assert a.result(5) == "old"
+    assert b.result(5) == "new"
+
+
+def test_pending_commands_run_by_priority(executor):
+    order = []
+    release, _ = block_lane(executor)
+    futures = [
+        executor.submit(CAMERA, order.append, name, priority=priority)
+        for name, priority in [
+            ("low", PRIORITY_LOW),
+            ("normal-1", PRIORITY_NORMAL),
+            ("urgent", PRIORITY_URGENT),
+            ("normal-2", PRIORITY_NORMAL),
+        ]
+    ]
+    release.set()
+    for future in futures:
+        future.result(5)
+
+    # 相同优先级按提交顺序执行
+    assert order == ["urgent", "normal-1", "normal-2", "low"]
+
+
+def test_exclusive_commands_are_serialised(executor):
+    active = []
+    overlap = []
+
+    def command():
+        active.append(1)
+        overlap.append(len(active))
+        time.sleep(0.02)
+        active.pop()
+
+    futures = [executor.submit(CAMERA, command) for _ in range(4)]
+    for future in futures:
+        future.result(5)
+    assert overlap == [1, 1, 1, 1]
+
+
+def test_shared_commands_run_concurrently(executor):
+    barrier = threading.Barrier(3, timeout=5)
+    futures = [
+        executor.submit(CAMERA, barrier.wait, exclusive=False) for _ in range(3)
+    ]
+    # 三个读命令必须同时在执行才能通过barrier
+    assert sorted(future.result(5) for future in futures) == [0, 1, 2]
+
+
+def test_cameras_do_not_block_each_other(executor):
+    release, blocked = block_lane(executor)
+    assert executor.submit("192.168.1.11:8080", lambda: "other").result(5) == "other"
+    assert not blocked.done()
+    release.set()
+
+
+def test_cancel_pending(executor):
+    release, running = block_lane(executor)
+    ran = []
+    pending = [executor.submit(CAMERA, ran.append, i) for i in range(3)]
+
+    assert executor.cancel_pending(CAMERA) == 3
+    release.set()
+    running.result(5)
+
+    assert all(future.cancelled() for future in pending)
+    with pytest.raises(CancelledError):
+        pending[0].result()
+    # 取消后通道可以继续使用
+    assert executor.submit(CAMERA, lambda: "next").result(5) == "next"
+    assert ran == []
+    assert executor.cancel_pending("192.168.1.99:8080") == 0
+
+
+def test_timeout(executor):
+    timed_out = threading.Event()
+    release = threading.Event()
+
+    future = executor.submit(
+        CAMERA, release.wait, 5, timeout=0.05, on_timeout=timed_out.set
+    )
+    with pytest.raises(TimeoutError):
+        future.result(5)
+    assert timed_out.wait(5)
+
+    # 超时的命令仍占用通道, 结束后后续命令才能执行
+    after = executor.submit(CAMERA, lambda: "after")
+    assert not after.done()
+    release.set()
+    assert after.result(5) == "after"
+
+
+def test_exception_is_returned_through_future(executor):
+    def fail():
+        raise ValueError("bad")
+
+    with pytest.raises(ValueError):
+        executor.submit(CAMERA, fail).result(5)
+    assert executor.submit(CAMERA, lambda: "ok").result(5) == "ok"
@@ -0,0 +1,61 @@
+import threading
+
+from src.common.frame.camera_frame import CameraFrame
+from src.common.frame.frame_mailbox import FrameMailbox
+
+CAMERA = "192.168.1.10:8080"
+
+
+def make_frame(sequence, camera=CAMERA):
+    frame = CameraFrame(camera, bytes([sequence]), {}, sequence)
+    frame.timestamp = float(sequence)
+    return frame
+
+
+def test_keeps_latest_frame():
+    mailbox = FrameMailbox()
+    # 只有信箱由空变非空时才需要通知
+    assert mailbox.put(make_frame(1))
+    assert not mailbox.put(make_frame(2))
+    assert not mailbox.put(make_frame(3))
+
+    assert mailbox.take(CAMERA).sequence == 3
+    assert mailbox.take(CAMERA) is None
+    assert mailbox.get_dropped(CAMERA) == 2
+    assert mailbox.put(make_frame(4))
+
+
+def test_lossless_keeps_order_up_to_limit():
+    mailbox = FrameMailbox(lossless=True, max_frames=3)
+    for sequence in range(5):
+        mailbox.put(make_frame(sequence))
+
+    assert [mailbox.take(CAMERA).sequence for _ in range(3)] == [2, 3, 4]
+    assert mailbox.get_dropped(CAMERA) == 2
+
+
+def test_take_any_returns_oldest_across_cameras():
+    mailbox = FrameMailbox(lossless=True)
+    mailbox.put(make_frame(1, "a"))
+    mailbox.put(make_frame(2, "b"))
+    mailbox.put(make_frame(3, "a"))
+
+    assert [mailbox.take_any(0).sequence for _ in range(3)] == [1, 2, 3]
+    assert mailbox.take_any(0) is None
+
+
+def test_take_any_waits_for_frame():
+    mailbox = FrameMailbox()
+    threading.Timer(0.05, mailbox.put, (make_frame(1),)).start()
+    assert mailbox.take_any(5).sequence == 1
+
+
+def test_remove_releases_camera():
+    mailbox = FrameMailbox()
+    mailbox.put(make_frame(1))
+    mailbox.put(make_frame(2))
+    mailbox.remove(CAMERA)
+
+    assert mailbox.slots == {}
+    assert mailbox.take(CAMERA) is None
+    assert mailbox.get_dropped(CAMERA) == 0
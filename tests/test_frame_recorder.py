@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from src.common.frame import frame_recorder
+from src.common.frame.camera_frame import CameraFrame
+from src.common.frame.frame_recorder import FrameRecorder
+
+CAMERA = "192.168.1.10:8080"
+
+
+def make_frames(start, count, size=100):
+    return [
+        CameraFrame(CAMERA, bytes([i % 256]) * size, {}, i)
+        for i in range(start, start + count)
+    ]
+
+
+def list_records(root):
+    return sorted(name for _, _, names in os.walk(root) for name in names)
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorder = FrameRecorder(str(tmp_path / "records"), max_bytes=1000)
+    recorder.open()
+    return recorder
+
+
+def test_writes_frames_per_camera(recorder, tmp_path):
+    recorder.write(make_frames(1, 3))
+
+    directory = tmp_path / "records" / "192.168.1.10_8080"
+    names = sorted(os.listdir(directory))
+    assert [name.split("_")[0] for name in names] == ["00000001", "00000002", "00000003"]
+    assert (directory / names[0]).read_bytes() == b"\x01" * 100
+    assert recorder.usedBytes == 300
+    assert recorder.written == 3
+
+
+def test_removes_oldest_over_quota(recorder, tmp_path):
+    recorder.write(make_frames(1, 8))
+    recorder.write(make_frames(9, 8))
+
+    names = list_records(tmp_path / "records")
+    assert len(names) == 10
+    assert names[0].startswith("00000007_")
+    assert recorder.usedBytes == 1000
+
+
+def test_counts_existing_records_on_open(recorder, tmp_path):
+    recorder.write(make_frames(1, 8))
+
+    reopened = FrameRecorder(str(tmp_path / "records"), max_bytes=500)
+    reopened.open()
+    assert reopened.usedBytes == 500
+    assert len(list_records(tmp_path / "records")) == 5
+
+
+# 批内某个文件写入失败时, 已创建的文件仍计入配额并参与轮转
+def test_failed_batch_keeps_written_files_tracked(recorder, tmp_path, monkeypatch):
+    realOpen = open
+    opened = []
+
+    def failing_open(path, mode="r", *args, **kwargs):
+        opened.append(path)
+        if len(opened) == 3:
+            raise OSError("disk full")
+        return realOpen(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr(frame_recorder, "open", failing_open, raising=False)
+    with pytest.raises(OSError):
+        recorder.write(make_frames(1, 5))
+    monkeypatch.undo()
+
+    assert len(recorder.files) == 2
+    assert recorder.usedBytes == 200
+
+    recorder.write(make_frames(6, 10))
+    assert recorder.usedBytes == 1000
+    assert len(list_records(tmp_path / "records")) == 10
@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+from src.common.frame import frame_ring
+from src.common.frame.frame_ring import FrameRing, FrameRingStore, export_frames
+
+CAMERA = "192.168.1.10:8080"
+
+
+def put_frames(ring, count, size=10, start=0):
+    for i in range(start, start + count):
+        assert ring.put(bytes([i % 256]) * size, i, float(i), {"seq": i})
+
+
+def test_put_and_get_latest():
+    ring = FrameRing(1000, 16)
+    assert ring.get_latest(CAMERA) is None
+    assert ring.get_range() is None
+
+    put_frames(ring, 3)
+    latest = ring.get_latest(CAMERA)
+    assert (latest.camera, latest.sequence, latest.timestamp) == (CAMERA, 2, 2.0)
+    assert latest.data == b"\x02" * 10
+    assert latest.meta == {"seq": 2}
+    assert ring.get_range() == (0.0, 2.0)
+
+
+def test_evicts_oldest_by_frame_count():
+    ring = FrameRing(1000, 4)
+    put_frames(ring, 10)
+
+    assert len(ring) == 4
+    assert [f.sequence for f in ring.get_recent(CAMERA, 100, now=9.0)] == [6, 7, 8, 9]
+
+
+def test_evicts_overwritten_frames_on_wrap():
+    ring = FrameRing(100, 64)
+    put_frames(ring, 25, size=30)
+
+    frames = ring.get_recent(CAMERA, 100, now=24.0)
+    assert sum(len(f.data) for f in frames) <= 100
+    assert [f.sequence for f in frames] == list(range(25 - len(frames), 25))
+    assert all(f.data == bytes([f.sequence]) * 30 for f in frames)
+
+
+def test_rejects_frame_larger_than_capacity():
+    ring = FrameRing(100, 16)
+    assert not ring.put(b"x" * 101, 0, 0.0)
+    assert len(ring) == 0
+
+
+def test_get_at_returns_frame_not_after_timestamp():
+    ring = FrameRing(1000, 16)
+    put_frames(ring, 5)
+
+    assert ring.get_at(CAMERA, 2.0).sequence == 2
+    assert ring.get_at(CAMERA, 2.5).sequence == 2
+    assert ring.get_at(CAMERA, 99.0).sequence == 4
+    assert ring.get_at(CAMERA, -1.0) is None
+
+
+def test_get_recent_window():
+    ring = FrameRing(1000, 16)
+    put_frames(ring, 10)
+
+    assert [f.sequence for f in ring.get_recent(CAMERA, 3, now=9.0)] == [6, 7, 8, 9]
+
+
+# 随机大小的帧持续写入, 任何时刻读出的都应是最新的连续若干帧且数据完整
+@pytest.mark.parametrize("initial", [50, frame_ring.RING_INITIAL_BYTES])
+def test_random_frames_stay_consistent(monkeypatch, initial):
+    monkeypatch.setattr(frame_ring, "RING_INITIAL_BYTES", initial)
+    rng = random.Random(1)
+    ring = FrameRing(1000, 16)
+    written = []
+    for i in range(2000):
+        data = bytes([i % 256]) * rng.randint(1, 400)
+        assert ring.put(memoryview(data), i, float(i))
+        written.append(data)
+
+        frames = ring.get_recent(CAMERA, 1e9, now=float(i))
+        assert 0 < len(frames) <= 16
+        assert [f.sequence for f in frames] == list(range(i + 1 - len(frames), i + 1))
+        assert [f.data for f in frames] == written[-len(frames) :]
+
+
+def test_buffer_grows_on_demand(monkeypatch):
+    monkeypatch.setattr(frame_ring, "RING_INITIAL_BYTES", 64)
+    ring = FrameRing(10000, 1000)
+    assert len(ring.data) == 64
+
+    put_frames(ring, 10, size=30)
+    assert len(ring.data) == 512
+    assert [f.sequence for f in ring.get_recent(CAMERA, 100, now=9.0)] == list(range(10))
+
+    put_frames(ring, 1000, size=30, start=10)
+    assert len(ring.data) == 10000
+
+
+def test_store_capacity():
+    store = FrameRingStore(0)
+    assert not store.put(CAMERA, b"x", 1, 1.0)
+    assert store.get_latest(CAMERA) is None
+
+    store.set_capacity(1000)
+    assert store.put(CAMERA, b"x", 1, 1.0)
+    assert store.get_latest(CAMERA).data == b"x"
+    assert store.get_latest("other") is None
+
+    # 修改上限时丢弃已缓存的帧
+    store.set_capacity(2000)
+    assert store.get_latest(CAMERA) is None
+
+
+def test_export_frames(tmp_path):
+    ring = FrameRing(1000, 16)
+    put_frames(ring, 3)
+
+    export_frames(ring.get_recent(CAMERA, 100, now=2.0), str(tmp_path / "replay"))
+    assert sorted(p.name for p in (tmp_path / "replay").iterdir()) == [
+        "00000000.jpg",
+        "00000001.jpg",
+        "00000002.jpg",
+    ]
+    assert (tmp_path / "replay" / "00000001.jpg").read_bytes() == b"\x01" * 10
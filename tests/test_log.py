@@ -0,0 +1,61 @@
+import logging
+import os
+
+from src.log import SizedTimedRotatingFileHandler
+
+
+def write_records(path, count, max_bytes=200, backup_count=3):
+    handler = SizedTimedRotatingFileHandler(
+        str(path), max_bytes=max_bytes, backup_count=backup_count
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    for i in range(count):
+        handler.emit(logging.makeLogRecord({"msg": f"line {i:03d} " + "x" * 40}))
+    handler.close()
+    return handler
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.split()[1] for line in f]
+
+
+def test_size_rollover_keeps_newest_backups(tmp_path):
+    path = tmp_path / "t.log"
+    handler = write_records(path, 60)
+
+    rotated = [p for _, p in handler.get_rotated_files()]
+    assert len(rotated) == 3
+
+    # 保留的备份加上当前文件应是连续的最新记录
+    lines = []
+    for p in rotated + [str(path)]:
+        lines += read_lines(p)
+    assert lines == [f"{i:03d}" for i in range(60 - len(lines), 60)]
+
+
+def test_rotated_names_sort_by_index(tmp_path):
+    path = tmp_path / "t.log"
+    handler = write_records(path, 60, backup_count=20)
+
+    rotated = handler.get_rotated_files()
+    indexes = [key[1] for key, _ in rotated]
+    assert indexes == list(range(1, len(indexes) + 1))
+    assert len(indexes) > 10
+
+    lines = []
+    for _, p in rotated:
+        lines += read_lines(p)
+    lines += read_lines(path)
+    assert lines == [f"{i:03d}" for i in range(60)]
+
+
+def test_more_than_ten_rotations_keep_highest_indexes(tmp_path):
+    path = tmp_path / "t.log"
+    handler = write_records(path, 60, backup_count=12)
+
+    indexes = [key[1] for key, _ in handler.get_rotated_files()]
+    # ".10"之后的文件不能按字符串排序被当作最旧的删除
+    assert len(indexes) == 12
+    assert indexes == list(range(indexes[-1] - 11, indexes[-1] + 1))
+    assert indexes[-1] > 12
@@ -0,0 +1,107 @@
+import pytest
+
+from src.driver.driver_socket.camera_socket.multipart_parser import (
+    MultipartError,
+    MultipartParser,
+    get_boundary,
+)
+
+BOUNDARY = b"XyZ"
+# 图片中包含分隔符的前缀, 不能被当作分隔符
+IMAGE = b"\xff\xd8" + b"a" * 100 + b"\r\n--Xy" + b"b" * 100 + b"\xff\xd9"
+
+
+def build_body(image=IMAGE, boundary=BOUNDARY, seq=b"7"):
+    return (
+        b"--" + boundary + b"\r\n"
+        b'Content-Disposition: form-data; name="seq"\r\n\r\n' + seq + b"\r\n"
+        b"--" + boundary + b"\r\n"
+        b'Content-Disposition: form-data; name="image"; filename="a.jpg"\r\n'
+        b"Content-Type: image/jpeg\r\n\r\n" + image + b"\r\n"
+        b"--" + boundary + b"--\r\n"
+    )
+
+
+def get_image(parser, body):
+    return body[parser.image.start : parser.image.end]
+
+
+def test_parse_whole_body():
+    body = build_body()
+    parser = MultipartParser(BOUNDARY)
+    parser.feed(body, len(body))
+
+    assert parser.is_complete()
+    assert parser.fields == {"seq": "7"}
+    assert get_image(parser, body) == IMAGE
+    assert parser.image.filename == "a.jpg"
+
+
+@pytest.mark.parametrize("step", [1, 2, 3, 7, 64])
+def test_parse_incrementally(step):
+    body = build_body()
+    # 与接收时一样: 缓冲区预先分配, end随接收逐步增加
+    buffer = bytearray(len(body))
+    parser = MultipartParser(BOUNDARY)
+    for end in range(step, len(body) + step, step):
+        end = min(end, len(body))
+        buffer[:end] = body[:end]
+        parser.feed(buffer, end)
+        if end < len(body) - len(b"--\r\n"):
+            assert not parser.is_complete()
+
+    assert parser.is_complete()
+    assert parser.fields == {"seq": "7"}
+    assert bytes(get_image(parser, buffer)) == IMAGE
+
+
+def test_learn_boundary_from_first_line():
+    body = build_body(boundary=b"learned")
+    parser = MultipartParser()
+    parser.feed(body, len(body))
+
+    assert parser.boundary == b"learned"
+    assert parser.is_complete()
+    assert get_image(parser, body) == IMAGE
+
+
+def test_incomplete_body():
+    body = build_body()
+    parser = MultipartParser(BOUNDARY)
+    parser.feed(body, len(body) - 10)
+
+    # 图片之后的分隔符还未收全
+    assert not parser.is_complete()
+    assert parser.image is None
+    assert parser.fields == {"seq": "7"}
+
+
+def test_unexpected_boundary():
+    body = build_body(boundary=b"other")
+    with pytest.raises(MultipartError):
+        MultipartParser(BOUNDARY).feed(body, len(body))
+
+
+def test_invalid_data_after_boundary():
+    body = build_body().replace(b"XyZ--\r\n", b"XyZxx\r\n")
+    with pytest.raises(MultipartError):
+        MultipartParser(BOUNDARY).feed(body, len(body))
+
+
+def test_part_head_too_long():
+    body = b"--XyZ\r\n" + b"X-Long: " + b"a" * 8192
+    with pytest.raises(MultipartError):
+        MultipartParser(BOUNDARY).feed(body, len(body))
+
+
+@pytest.mark.parametrize(
+    "content_type, boundary",
+    [
+        ("multipart/form-data; boundary=XyZ", b"XyZ"),
+        ('Multipart/Form-Data; charset=utf-8; boundary="a b"', b"a b"),
+        ("multipart/form-data", None),
+        ("image/jpeg", None),
+    ],
+)
+def test_get_boundary(content_type, boundary):
+    assert get_boundary(content_type) == boundary